@@ -0,0 +1,210 @@
+# ================================================== #
+#    Batched N-vehicle simulation
+# ================================================== #
+import numpy as np
+
+import X_Quad as XQ
+from Data_Logger import CHANNELS, CONSTANTS
+from Motor_Inputs import OPEN_LOOP
+from Kinematics import rotation_matrices, rotate_batch
+
+# ================================================== #
+#    Layouts
+# -------------------------------------------------- #
+#  State is (N, 12), one row per vehicle:
+#    x, y, z, dx, dy, dz, phi, theta, psi, p, q, r
+#  Parameters are (N,) arrays (scalars broadcast)
+# ================================================== #
+STATE_KEYS = [
+    "x", "y", "z",
+    "dx", "dy", "dz",
+    "phi", "theta", "psi",
+    "p", "q", "r",
+]
+
+PARAM_KEYS = CONSTANTS
+
+LOG_KEYS = CHANNELS[1:]                                  # everything but "t"
+
+
+
+# ================================================== #
+#    Parameter arrays
+# ================================================== #
+def batch_params(n, **params):
+    # Missing parameters default to the X_Quad values
+    unknown = set(params) - set(PARAM_KEYS)
+    if unknown:
+        raise KeyError(f"Unknown parameter(s): {sorted(unknown)}")
+
+    P = {}
+    for key in PARAM_KEYS:
+        value = np.asarray(params.get(key, getattr(XQ, key)), dtype=float)
+        P[key] = np.broadcast_to(value, (n,)).copy()
+    return P
+
+
+def _batch_size(state0, params):
+    sizes = {np.size(v) for v in params.values() if np.ndim(v) > 0}
+    if state0 is not None:
+        sizes.add(np.shape(np.atleast_2d(state0))[0])    # (12,) is one vehicle
+    sizes.discard(1)
+    if len(sizes) > 1:
+        raise ValueError(f"Inconsistent batch sizes: {sorted(sizes)}")
+    return sizes.pop() if sizes else 1
+
+
+def _store(logs, k, keys, values):
+    # Row k of the requested channels among keys
+    for key, value in zip(keys, values):
+        if key in logs:
+            logs[key][k] = value
+
+
+
+# ================================================== #
+#    Batched dynamic model
+# -------------------------------------------------- #
+#  Same semi-implicit Euler scheme as X_Quad.model(),
+#  applied column-wise to all N vehicles at once.
+#  Returns {channel: (n_steps, N)} plus "t" and the
+#  final (N, 12) state. channels (Data_Logger names,
+#  default all) limits what is logged; body-frame
+#  values and Euler accelerations are only computed
+#  when one of them is requested.
+# ================================================== #
+def batch_model(state0=None, t_tot=None, dt=None, schedule=OPEN_LOOP, rotor=None,
+                channels=None, **params):
+    channels = LOG_KEYS if channels is None else [c for c in channels if c != "t"]
+    unknown = [c for c in channels if c not in CHANNELS]
+    if unknown:
+        raise KeyError(f"Unknown channel(s): {unknown}")
+
+    t_tot = XQ.t_tot if t_tot is None else t_tot
+    dt = XQ.dt if dt is None else dt
+    g = XQ.g
+
+    N = _batch_size(state0, params)
+    P = batch_params(N, **params)
+    m, I_x, I_y, I_z = P["m"], P["I_x"], P["I_y"], P["I_z"]
+    c_T, c_RD = P["c_T"], P["c_RD"]
+
+    # ================================================== #
+    #    Initial Values (rows of S are state channels)
+    # ================================================== #
+    if state0 is None:
+        S = np.zeros((12, N))
+    else:
+        S = np.array(np.broadcast_to(state0, (N, 12)), dtype=float).T.copy()
+    x, y, z, dx, dy, dz, phi, theta, psi, p, q, r = S
+
+    # ================================================== #
+    #    Effective Arm Length
+    # ================================================== #
+    l_x, l_y = XQ.effective_arms(P["l"], P["angle_motor1_2"])  # [m]
+
+    omega_h = np.sqrt((m*g)/(4*c_T))                         # [rad/sec]
+
+    # Rotor model (see Rotor_Model.py): lag gain and table inputs
+    if rotor is not None:
+        omega_h = rotor.hover_speed(m, g, c_T)
+        a_lag = rotor.gain(dt)
+        P_rot = {"l_x": l_x, "l_y": l_y, "c_T": c_T, "c_RD": c_RD}
+
+
+
+    # ================================================== #
+    #    Preallocated logs
+    # ================================================== #
+    t_vec = np.arange(0, t_tot + dt, dt)
+    n_steps = len(t_vec)
+    logs = {key: np.empty((n_steps, N)) for key in channels}
+    prev_dang = np.zeros((3, N))
+    body = not logs.keys().isdisjoint(["u", "v", "w", "du", "dv", "dw"])
+    euler_acc = not logs.keys().isdisjoint(["ddphi", "ddtheta", "ddpsi"])
+
+    # Rotation buffers, refilled in place every step
+    R = np.empty((N, 3, 3))
+    body_vel, body_acc = np.empty((N, 3)), np.empty((N, 3))
+
+
+
+    # ================================================== #
+    #    Time loop
+    # ================================================== #
+    for k, t in enumerate(t_vec):
+        cmd = np.maximum(omega_h + schedule.offset(t)[:, None], 0.0)
+        if rotor is None:
+            omega = cmd
+            w2 = omega**2
+
+            F_T = c_T * (w2[0] + w2[1] + w2[2] + w2[3])
+            M_x = l_y * c_T * (-w2[0] + w2[1] + w2[2] - w2[3])
+            M_y = l_x * c_T * (-w2[0] - w2[1] + w2[2] + w2[3])
+            M_z = c_RD * (w2[0] - w2[1] + w2[2] - w2[3])
+        else:
+            omega = cmd if k == 0 else rotor.step(omega, cmd, a_lag)
+            F_T, M_x, M_y, M_z = rotor.forces_moments(omega, P_rot)
+
+        # ================================================= #
+        #    Rotation (computed once for all vehicles)
+        # ================================================= #
+        rotation_matrices(phi, theta, psi, out=R)
+        s_phi, c_phi = np.sin(phi), np.cos(phi)
+        s_th, c_th = np.sin(theta), np.cos(theta)
+
+        # ================================================= #
+        #    Inertial frame linear dynamics
+        # ================================================= #
+        acc = (F_T / m) * R[:, :, 2].T
+        acc[2] -= g
+        S[3:6] += acc * dt
+        S[0:3] += S[3:6] * dt
+
+        # ================================================= #
+        #    Body frame linear dynamics
+        # ================================================= #
+        if body:
+            rotate_batch(R, S[3:6].T, acc.T, out=(body_vel, body_acc))
+
+        # ================================================= #
+        #    Body frame angular dynamics
+        # ================================================= #
+        dp = (((I_y - I_z) * q * r) / I_x) + (M_x / I_x)
+        dq = (((I_z - I_x) * p * r) / I_y) + (M_y / I_y)
+        dr = (((I_x - I_y) * p * q) / I_z) + (M_z / I_z)
+        p += dp * dt
+        q += dq * dt
+        r += dr * dt
+
+        # ================================================= #
+        #    Inertial angular dynamics
+        # ================================================= #
+        t_th = s_th / c_th
+        dphi = p + (s_phi * q + c_phi * r) * t_th
+        dtheta = c_phi * q - s_phi * r
+        dpsi = (s_phi * q + c_phi * r) / c_th
+        dang = np.array([dphi, dtheta, dpsi])
+        if euler_acc:
+            _store(logs, k, ("ddphi", "ddtheta", "ddpsi"), (dang - prev_dang) / dt)
+        S[6:9] += dang * dt
+        prev_dang = dang
+
+        # ================================================= #
+        #    Log (requested channels only)
+        # ================================================= #
+        _store(logs, k, STATE_KEYS, S)
+        _store(logs, k, ("ddx", "ddy", "ddz"), acc)
+        if body:
+            _store(logs, k, ("u", "v", "w"), body_vel.T)
+            _store(logs, k, ("du", "dv", "dw"), body_acc.T)
+        _store(logs, k, ("dphi", "dtheta", "dpsi"), dang)
+        _store(logs, k, ("dp", "dq", "dr"), (dp, dq, dr))
+        _store(logs, k, ("omega_1", "omega_2", "omega_3", "omega_4"), omega)
+        _store(logs, k, ("F_T", "M_x", "M_y", "M_z"), (F_T, M_x, M_y, M_z))
+
+
+    logs["t"] = t_vec
+    logs["state"] = S.T.copy()
+    logs["params"] = P
+    return logs
@@ -0,0 +1,243 @@
+# ================================================== #
+#    Benchmarks / performance regression harness
+# -------------------------------------------------- #
+#  python Benchmark.py                      (report)
+#  python Benchmark.py --save-baseline b.json
+#  python Benchmark.py --baseline b.json --threshold 0.2
+#     -> exit 1 if any scenario's throughput drops, or
+#        its bytes/row or peak RSS grows, by more than
+#        the thresholds vs the baseline
+# ================================================== #
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import numpy as np
+from pathlib import Path
+
+try:
+    import resource                                      # POSIX only
+except ImportError:
+    resource = None
+
+
+
+# ================================================== #
+#    Scenarios
+# -------------------------------------------------- #
+#  name -> (kind, kwargs). Each returns the number of
+#  vehicle-steps and logged rows it produced.
+# ================================================== #
+SCENARIOS = {
+    "open_loop_dt0.05":        ("model", {"params": {"dt": 0.05}}),
+    "open_loop_dt0.01":        ("model", {"params": {"dt": 0.01}}),
+    "open_loop_dt0.001":       ("model", {"params": {"dt": 0.001}}),
+    "open_loop_rk4_dt0.05":    ("model", {"params": {"dt": 0.05}, "method": "rk4"}),
+    "open_loop_numba_dt0.001": ("model", {"params": {"dt": 0.001}, "backend": "numba"}),
+    "long_horizon_1h_dt0.01":  ("stream", {"params": {"t_tot": 3600, "dt": 0.01}, "decimate": 10}),
+    "fleet_100_dt0.05":        ("batch", {"n": 100, "dt": 0.05}),
+    "fleet_1000_dt0.05":       ("batch", {"n": 1000, "dt": 0.05}),
+}
+
+QUICK = ["open_loop_dt0.05", "open_loop_dt0.01", "open_loop_rk4_dt0.05", "fleet_100_dt0.05"]
+
+
+def _run_scenario(kind, kwargs):
+    if kind == "model":
+        import X_Quad as XQ
+        logs = XQ.model(**kwargs)
+        return len(logs), len(logs)
+
+    if kind == "stream":
+        from Stream_Sim import StreamSim
+        sim = StreamSim(**kwargs)
+        return sim.n_steps, sim.run(callback=lambda block: None)
+
+    if kind == "batch":
+        from Batch_Sim import batch_model
+        n = kwargs["n"]
+        logs = batch_model(dt=kwargs["dt"], m=np.linspace(0.3, 0.45, n))
+        return len(logs["t"]) * n, len(logs["t"]) * n
+
+    raise ValueError(f"Unknown scenario kind '{kind}'")
+
+
+
+# ================================================== #
+#    Per-phase micro-benchmarks [us per call]
+# ================================================== #
+def phase_breakdown(number=20000):
+    import X_Quad as XQ
+    from Data_Logger import CHANNELS, Logger
+    from Motor_Inputs import open_loop_motor_inputs
+    from Profiling import Profiler
+    from Result_Store import save_results
+
+    omega_h = float(np.sqrt((XQ.m * XQ.g) / (4 * XQ.c_T)))
+    row = tuple(float(i) for i in range(len(CHANNELS)))
+    logger = Logger(number + 1)
+
+    def per_call(fn, n=number):
+        return 1e6 * min(timeit.repeat(fn, number=n, repeat=3)) / n
+
+    out = {
+        "open_loop_motor_inputs": per_call(lambda: open_loop_motor_inputs(37.3, omega_h)),
+        "Inertial2Body": per_call(lambda: XQ.Inertial2Body(0.1, 0.2, 0.3, 1.0, 2.0, 3.0)),
+        "Body2Inertial": per_call(lambda: XQ.Body2Inertial(0.1, 0.2, 1.0, 2.0, 3.0)),
+    }
+    logger.n = 0
+    out["Logger.record"] = 1e6 * timeit.timeit(lambda: logger.record(row), number=number) / number
+
+    # In-loop phases of the reference model() step
+    prof = Profiler()
+    XQ.model(profiler=prof)
+    for phase, p in prof.report()["phases"].items():
+        out[f"model.{phase}"] = p["mean_us"]
+
+    # Output, per logged row, for the 120 s reference run
+    logs = XQ.model()
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in (".npz", ".npy", ".xlsx"):
+            try:
+                t = min(timeit.repeat(lambda: save_results(logs, Path(tmp) / f"r{suffix}"),
+                                      number=1, repeat=2))
+            except ImportError:
+                continue                                 # e.g. openpyxl missing
+            out[f"save{suffix}_per_row"] = 1e6 * t / len(logs)
+    return out
+
+
+
+# ================================================== #
+#    One scenario in a fresh process (clean peak RSS)
+# -------------------------------------------------- #
+#  ru_maxrss is in bytes on macOS, KiB on Linux/BSD;
+#  no RSS figure (None) where resource is missing.
+# ================================================== #
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def _measure(name, repeat):
+    kind, kwargs = SCENARIOS[name]
+    _run_scenario(kind, kwargs)                          # warm up (imports, JIT)
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        steps, rows = _run_scenario(kind, kwargs)
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    _run_scenario(kind, kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "seconds": best,
+        "steps": steps,
+        "rows": rows,
+        "steps_per_s": steps / best,
+        "bytes_per_row": peak / max(rows, 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_benchmarks(names, repeat=3, phases=True):
+    ctx = mp.get_context("spawn")
+    results = {"python": sys.version.split()[0], "machine": platform.machine(), "scenarios": {}}
+    for name in names:
+        with ctx.Pool(1) as pool:
+            results["scenarios"][name] = pool.apply(_measure, (name, repeat))
+    if phases:
+        results["phases_us"] = phase_breakdown()
+    return results
+
+
+
+# ================================================== #
+#    Baseline comparison
+# -------------------------------------------------- #
+#  threshold:       allowed fractional steps/s drop
+#  bytes_threshold: allowed fractional bytes/row rise
+#  rss_threshold:   allowed fractional peak RSS rise
+# ================================================== #
+def compare(results, baseline, threshold, bytes_threshold=0.2, rss_threshold=0.2):
+    failures = []
+    for name, res in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        change = res["steps_per_s"] / base["steps_per_s"] - 1
+        res["vs_baseline"] = change
+        if change < -threshold:
+            failures.append(f"{name}: {change:+.1%} steps/s")
+
+        for key, limit, label in (("bytes_per_row", bytes_threshold, "bytes/row"),
+                                  ("peak_rss_mb", rss_threshold, "peak RSS")):
+            if res.get(key) is None or not base.get(key):
+                continue                                 # not measured (e.g. no resource module)
+            growth = res[key] / base[key] - 1
+            if growth > limit:
+                failures.append(f"{name}: {growth:+.1%} {label}")
+    return failures
+
+
+def report(results):
+    print(f"{'scenario':<26}{'time [s]':>10}{'steps/s':>14}{'B/row':>10}{'RSS [MB]':>10}{'vs base':>10}")
+    for name, res in results["scenarios"].items():
+        change = f"{res['vs_baseline']:+.1%}" if "vs_baseline" in res else ""
+        rss = "-" if res["peak_rss_mb"] is None else f"{res['peak_rss_mb']:.0f}"
+        print(f"{name:<26}{res['seconds']:>10.3f}{res['steps_per_s']:>14,.0f}"
+              f"{res['bytes_per_row']:>10.0f}{rss:>10}{change:>10}")
+    for phase, us in results.get("phases_us", {}).items():
+        print(f"  {phase:<28}{us:>10.2f} us")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quadrotor simulator benchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"subset of {list(SCENARIOS)}")
+    parser.add_argument("--quick", action="store_true", help="small scenario set")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-phases", action="store_true")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results as a baseline JSON")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed fractional steps/s drop (default 0.2)")
+    parser.add_argument("--bytes-threshold", type=float, default=0.2,
+                        help="allowed fractional bytes/row increase (default 0.2)")
+    parser.add_argument("--rss-threshold", type=float, default=0.2,
+                        help="allowed fractional peak RSS increase (default 0.2)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or (QUICK if args.quick else list(SCENARIOS))
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {unknown}")
+
+    results = run_benchmarks(names, args.repeat, phases=not args.no_phases)
+    failures = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold,
+                       args.bytes_threshold, args.rss_threshold) if args.baseline else []
+    report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2))
+    if failures:
+        print("Performance regression:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# ================================================== #
+#    Closed-loop control
+# -------------------------------------------------- #
+#  Controllers map the 12-state (Integrators layout,
+#  (12,) or (12, N)) to motor speeds (4,) or (4, N).
+#  They run at their own rate (ctrl.dt), faster or
+#  slower than the logging dt.
+# ================================================== #
+from abc import ABC, abstractmethod
+import numpy as np
+
+from Integrators import STEPPERS, derivatives
+
+
+
+# ================================================== #
+#    Motor mixing
+# -------------------------------------------------- #
+#  [F_T, M_x, M_y, M_z] = M @ [w1^2, w2^2, w3^2, w4^2]
+#  Same signs as the model's force/moment equations.
+#  The inverse is solved once, here, not every step.
+# ================================================== #
+def mixer_matrix(l_x, l_y, c_T, c_RD):
+    l_x, l_y, c_T, c_RD = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (l_x, l_y, c_T, c_RD)))
+    M = np.empty(l_x.shape + (4, 4))
+    M[..., 0, :] = c_T[..., None] * [1, 1, 1, 1]
+    M[..., 1, :] = (l_y * c_T)[..., None] * [-1, 1, 1, -1]
+    M[..., 2, :] = (l_x * c_T)[..., None] * [-1, -1, 1, 1]
+    M[..., 3, :] = c_RD[..., None] * [1, -1, 1, -1]
+    return M
+
+
+class Mixer:
+    def __init__(self, l_x, l_y, c_T, c_RD):
+        self.M = mixer_matrix(l_x, l_y, c_T, c_RD)
+        self.M_inv = np.linalg.inv(self.M)
+
+    def __call__(self, F_T, M_x, M_y, M_z):
+        wrench = np.array([F_T, M_x, M_y, M_z])
+        if self.M_inv.ndim == 2:
+            w2 = self.M_inv @ wrench
+        else:
+            w2 = np.einsum("nij,jn->in", self.M_inv, wrench)
+        return np.sqrt(np.maximum(w2, 0.0))
+
+
+
+# ================================================== #
+#    PID (vectorized, state per vehicle)
+# ================================================== #
+class PID:
+    def __init__(self, kp, ki=0.0, kd=0.0, i_limit=np.inf):
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.i_limit = i_limit
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+
+    def __call__(self, err, dt, derr=0.0):
+        self.integral = np.clip(self.integral + err * dt, -self.i_limit, self.i_limit)
+        return self.kp * err + self.ki * self.integral + self.kd * derr
+
+
+
+# ================================================== #
+#    Controller interface
+# -------------------------------------------------- #
+#  update(t, s, dt) -> motor speeds; dt is the period
+#  the controller actually runs at (closed_loop() may
+#  round ctrl.dt to fit the logging dt).
+# ================================================== #
+class Controller(ABC):
+    dt = 0.002                                           # Requested period [s]
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def update(self, t, s, dt):
+        ...
+
+
+
+# ================================================== #
+#    Cascaded PID attitude / altitude controller
+# -------------------------------------------------- #
+#  Altitude PID    -> collective thrust F_T
+#  Angle P (outer) -> body-rate setpoints
+#  Rate PID (inner)-> moments (I * alpha)
+#  Mixer           -> motor speeds
+#  setpoint: dict with z, phi, theta, psi, or a
+#            callable(t) returning such a dict
+# ================================================== #
+class CascadedPID(Controller):
+    def __init__(self, P, dt=0.002, setpoint=None,
+                 alt=(4.0, 0.5, 3.0), angle=(6.0, 6.0, 3.0),
+                 rate=((20.0, 1.0), (20.0, 1.0), (10.0, 0.5))):
+        self.P = P
+        self.dt = dt
+        self.setpoint = setpoint or {"z": 0.0, "phi": 0.0, "theta": 0.0, "psi": 0.0}
+        self.mixer = Mixer(P["l_x"], P["l_y"], P["c_T"], P["c_RD"])
+
+        self.alt = PID(alt[0], alt[1], alt[2], i_limit=2.0)
+        self.k_angle = angle
+        self.rate = [PID(kp, ki, i_limit=1.0) for kp, ki in rate]
+
+    def reset(self):
+        self.alt.reset()
+        for pid in self.rate:
+            pid.reset()
+
+    def update(self, t, s, dt):
+        P = self.P
+        sp = self.setpoint(t) if callable(self.setpoint) else self.setpoint
+        x, y, z, dx, dy, dz, phi, theta, psi, p, q, r = s
+
+        # ================================================= #
+        #    Altitude -> collective thrust
+        # ================================================= #
+        a_z = self.alt(sp["z"] - z, dt, -dz)
+        F_T = P["m"] * (P["g"] + a_z) / np.maximum(np.cos(phi) * np.cos(theta), 0.2)
+
+        # ================================================= #
+        #    Angles -> rates -> moments
+        # ================================================= #
+        p_ref = self.k_angle[0] * (sp["phi"] - phi)
+        q_ref = self.k_angle[1] * (sp["theta"] - theta)
+        r_ref = self.k_angle[2] * (sp["psi"] - psi)
+
+        M_x = P["I_x"] * self.rate[0](p_ref - p, dt)
+        M_y = P["I_y"] * self.rate[1](q_ref - q, dt)
+        M_z = P["I_z"] * self.rate[2](r_ref - r, dt)
+
+        return self.mixer(F_T, M_x, M_y, M_z)
+
+
+
+# ================================================== #
+#    Closed-loop propagation
+# -------------------------------------------------- #
+#  ctrl.dt <= dt: each logging step is split into
+#    n_inner = round(dt / ctrl.dt) periods h; the
+#    controller runs and the state advances once per h.
+#  ctrl.dt > dt: the state advances once per dt and
+#    the controller runs every round(ctrl.dt / dt)
+#    steps, its output held in between.
+#  update() gets the real period. Works for one vehicle
+#  (s0 (12,)) or a batch (s0 (12, N), P with (N,)
+#  arrays). Row k is the state at t_k + dt, matching
+#  X_Quad.model(). Returns (S, U).
+# ================================================== #
+def closed_loop(ctrl, s0, t_vec, dt, P, method="semi_implicit"):
+    if method not in STEPPERS:
+        raise ValueError(f"Closed loop needs a fixed-step method (have {list(STEPPERS)})")
+    step = STEPPERS[method]
+
+    if ctrl.dt <= dt:
+        n_inner, every = max(1, int(round(dt / ctrl.dt))), 1
+    else:
+        n_inner, every = 1, int(round(ctrl.dt / dt))
+    h = dt / n_inner
+    period = h * every
+
+    s = np.array(s0, dtype=float)
+    S = np.empty((len(t_vec),) + s.shape)
+    U = np.empty((len(t_vec), 4) + s.shape[1:])
+
+    ctrl.reset()
+    for k, t in enumerate(t_vec):
+        for i in range(n_inner):
+            if (k * n_inner + i) % every == 0:
+                omega = ctrl.update(t + i * h, s, period)
+            s = step(lambda s_: derivatives(s_, omega, P), s, h)
+        S[k] = s
+        U[k] = omega
+    return S, U
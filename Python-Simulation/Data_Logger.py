@@ -0,0 +1,171 @@
+# ================================================== #
+#    Preallocated columnar logger
+# ================================================== #
+import numpy as np
+
+# ================================================== #
+#    Channels (logged every step, in row order)
+# ================================================== #
+CHANNELS = [
+    "t",
+    "x", "y", "z",
+    "dx", "dy", "dz",
+    "ddx", "ddy", "ddz",
+
+    "u", "v", "w",
+    "du", "dv", "dw",
+
+    "phi", "theta", "psi",
+    "dphi", "dtheta", "dpsi",
+    "ddphi", "ddtheta", "ddpsi",
+
+    "p", "q", "r",
+    "dp", "dq", "dr",
+
+    "omega_1", "omega_2", "omega_3", "omega_4",
+    "F_T", "M_x", "M_y", "M_z",
+]
+
+# ================================================== #
+#    Core channels: what the model() loop propagates;
+#    the rest can be derived after the run
+#    (Post_Process.derive)
+# ================================================== #
+CORE = [
+    "t",
+    "x", "y", "z",
+    "dx", "dy", "dz",
+    "phi", "theta", "psi",
+    "p", "q", "r",
+    "omega_1", "omega_2", "omega_3", "omega_4",
+]
+
+DERIVED = [c for c in CHANNELS if c not in CORE]
+
+# ================================================== #
+#    Constants (stored once as run metadata)
+# ================================================== #
+CONSTANTS = [
+    "m",
+    "I_x", "I_y", "I_z",
+    "l", "angle_motor1_2",
+    "c_T", "c_RD",
+]
+
+
+
+def n_steps_for(t_tot, dt):
+    # Same sample count as np.arange(0, t_tot + dt, dt)
+    return len(np.arange(0, t_tot + dt, dt))
+
+
+
+# ================================================== #
+#    Logger
+# -------------------------------------------------- #
+#  One contiguous float64 block of shape
+#  (n_steps, n_channels). record() takes a full row
+#  in CHANNELS order and keeps only the selected
+#  channels.
+# -------------------------------------------------- #
+#  defer(compute) leaves the DERIVED columns empty
+#  until one of them (or the whole block) is first
+#  read; compute() then returns them as a dict of
+#  (n,) arrays.
+# ================================================== #
+class Logger:
+    def __init__(self, n_steps, channels=None, meta=None):
+        channels = list(CHANNELS if channels is None else channels)
+        unknown = [c for c in channels if c not in CHANNELS]
+        if unknown:
+            raise KeyError(f"Unknown channel(s): {unknown}")
+
+        self.channels = channels
+        self.meta = dict(meta or {})
+        self._data = np.empty((n_steps, len(channels)), dtype=np.float64)
+        self.n = 0
+        self._pending = None
+
+        self._col = {c: i for i, c in enumerate(channels)}
+        self._all = channels == CHANNELS
+        self._idx = np.array([CHANNELS.index(c) for c in channels], dtype=np.intp)
+
+    @classmethod
+    def for_run(cls, t_tot, dt, channels=None, meta=None):
+        return cls(n_steps_for(t_tot, dt), channels, meta)
+
+    def record(self, row):
+        if self._all:
+            self._data[self.n] = row
+        else:
+            self._data[self.n] = np.asarray(row)[self._idx]
+        self.n += 1
+
+    def record_block(self, rows, channels=None):
+        # rows: (k, len(CHANNELS)) block in CHANNELS order,
+        # or (k, len(channels)) for a subset such as CORE
+        rows = np.asarray(rows)
+        k = len(rows)
+        if channels is None:
+            self._data[self.n:self.n + k] = rows if self._all else rows[:, self._idx]
+        else:
+            for j, c in enumerate(channels):
+                if c in self._col:
+                    self._data[self.n:self.n + k, self._col[c]] = rows[:, j]
+        self.n += k
+
+    # ================================================== #
+    #    Lazily derived channels
+    # ================================================== #
+    def defer(self, compute):
+        self._pending = compute
+
+    def _materialize(self):
+        compute, self._pending = self._pending, None
+        for c, values in compute().items():
+            if c in self._col:
+                self._data[:len(values), self._col[c]] = values
+
+    @property
+    def data(self):
+        if self._pending is not None:
+            self._materialize()
+        return self._data
+
+    # ================================================== #
+    #    Access
+    # ================================================== #
+    @property
+    def values(self):
+        return self.data[:self.n]
+
+    def keys(self):
+        return list(self.channels) + list(self.meta)
+
+    def __contains__(self, key):
+        return key in self._col or key in self.meta
+
+    def __getitem__(self, key):
+        if key in self._col:
+            if self._pending is not None and key in DERIVED:
+                self._materialize()
+            return self._data[:self.n, self._col[key]]
+        if key in self.meta:
+            return self.meta[key]
+        raise KeyError(key)
+
+    def __len__(self):
+        return self.n
+
+    # ================================================== #
+    #    DataFrame (zero-copy view of the log block)
+    # -------------------------------------------------- #
+    #  include_meta=True broadcasts the constants into
+    #  columns (a copy), matching the old per-step layout
+    # ================================================== #
+    def to_frame(self, include_meta=False):
+        import pandas as pd
+        df = pd.DataFrame(self.values, columns=self.channels, copy=False)
+        if include_meta:
+            df = df.assign(**{k: v for k, v in self.meta.items()})
+        return df
@@ -3,97 +3,155 @@
 #    Written by Brennan Larsen
 # ================================================== #
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 
+from Result_Store import load_results
+
 rad2deg = 180 / np.pi
 
-def plot_states():
-    # ================================================== #
-    #    Load Excel and extract data
-    # ================================================== #
-    data_path = Path(__file__).parent / "Data" / "Data1.xlsx"
-    df = pd.read_excel(data_path)
 
 
+# ================================================== #
+#    Panels: (y label, [(channel, legend, scale)])
+# -------------------------------------------------- #
+#  Filled column by column; the default six give the
+#  original 3 x 2 layout.
+# ================================================== #
+PANELS = [
+    ("Inertial Pos.", [("x", "x [m]", 1), ("y", "y [m]", 1), ("z", "z [m]", 1)]),
+    ("Inertial Vel.", [("dx", r"$\dot{x}$ [m/s]", 1), ("dy", r"$\dot{y}$ [m/s]", 1),
+                       ("dz", r"$\dot{z}$ [m/s]", 1)]),
+    ("Inertial Acc.", [("ddx", r"$\ddot{x}$ [m/s²]", 1), ("ddy", r"$\ddot{y}$ [m/s²]", 1),
+                       ("ddz", r"$\ddot{z}$ [m/s²]", 1)]),
+    ("Euler Angles",  [("phi", "phi [deg]", rad2deg), ("theta", "theta [deg]", rad2deg),
+                       ("psi", "psi [deg]", rad2deg)]),
+    ("Body Rates",    [("p", "p [deg/s]", rad2deg), ("q", "q [deg/s]", rad2deg),
+                       ("r", "r [deg/s]", rad2deg)]),
+    ("Body Acc.",     [("dp", r"$\dot{p}$ [deg/s²]", rad2deg), ("dq", r"$\dot{q}$ [deg/s²]", rad2deg),
+                       ("dr", r"$\dot{r}$ [deg/s²]", rad2deg)]),
+]
+
+DEFAULT_CHANNELS = [ch for _, lines in PANELS for ch, _, _ in lines]
+
+
+
+# ================================================== #
+#    Min/max decimation per pixel column
+# -------------------------------------------------- #
+#  Splits the samples into n_bins equal chunks and
+#  keeps each chunk's min and max (in time order), so
+#  peaks survive while at most 2*n_bins points are
+#  drawn. Returns sample indices.
+# ================================================== #
+def minmax_indices(y, n_bins):
+    n = len(y)
+    if n <= 2 * n_bins:
+        return np.arange(n)
 
-    t = df["t"].to_numpy()
+    k = -(-n // n_bins)
+    pad = k * n_bins - n
+    yb = np.pad(y, (0, pad), mode="edge").reshape(n_bins, k)
+    base = np.arange(n_bins) * k
+    i_min = base + yb.argmin(axis=1)
+    i_max = base + yb.argmax(axis=1)
 
-    x, y, z = df["x"].to_numpy(), df["y"].to_numpy(), df["z"].to_numpy()
-    dx, dy, dz = df["dx"].to_numpy(), df["dy"].to_numpy(), df["dz"].to_numpy()
-    ddx, ddy, ddz = df["ddx"].to_numpy(), df["ddy"].to_numpy(), df["ddz"].to_numpy()
+    idx = np.empty(2 * n_bins, dtype=np.intp)
+    idx[0::2] = np.minimum(i_min, i_max)
+    idx[1::2] = np.maximum(i_min, i_max)
+    idx = np.minimum(idx, n - 1)
+    return np.unique(np.r_[0, idx, n - 1])
 
-    phi, theta, psi = df["phi"].to_numpy(), df["theta"].to_numpy(), df["psi"].to_numpy()
-    p, q, r = df["p"].to_numpy(), df["q"].to_numpy(), df["r"].to_numpy()
-    dp, dq, dr = df["dp"].to_numpy(), df["dq"].to_numpy(), df["dr"].to_numpy()
 
+def _layout(channels):
+    panels = []
+    for ylabel, lines in PANELS:
+        keep = [line for line in lines if line[0] in channels]
+        if keep:
+            panels.append((ylabel, keep))
+    known = {ch for _, lines in panels for ch, _, _ in lines}
+    panels += [(ch, [(ch, ch, 1)]) for ch in channels if ch not in known]
+    return panels
 
 
+
+# ================================================== #
+#    Plot
+# -------------------------------------------------- #
+#  results:  Logger, DataFrame or a Result_Store path
+#            (default Data/Data1.npz, as X_Quad writes it)
+#  channels: subset to draw (default: the 18 states)
+#  save:     .png / .svg / .pdf path -> rendered
+#            headless (no GUI backend, no plt.show())
+#  show:     plt.show() (default: only if not saving)
+#  decimate: False draws every sample
+# ================================================== #
+def plot_states(results=None, channels=None, save=None, show=None, decimate=True,
+                figsize=(12, 10), dpi=100):
     # ================================================== #
-    #    Create two columns for fig
+    #    Load results (in memory, or any Result_Store format)
     # ================================================== #
-    fig, axes = plt.subplots(3, 2, sharex=True, figsize=(12, 10))
-    ax_left = axes[:, 0]                                 # left column (3 subplots)
-    ax_right = axes[:, 1]                                # right column (3 subplots)
+    if results is None:
+        results = Path("Data") / "Data1.npz"
+    if isinstance(results, (str, Path)):
+        results = load_results(results)
 
+    channels = list(DEFAULT_CHANNELS if channels is None else channels)
+    missing = [ch for ch in channels if ch not in results]
+    if missing:
+        raise KeyError(f"Channel(s) not in results: {missing}")
+    if show is None:
+        show = save is None
 
 
-    # ================================================= #
-    #    Left column:
-    #    x, y, z pos, vel, and acc
-    # ================================================= #
-    ax_left[0].plot(t, x, label="x [m]")
-    ax_left[0].plot(t, y, label="y [m]")
-    ax_left[0].plot(t, z, label="z [m]")
-    ax_left[0].set_ylabel("Inertial Pos.")
-    ax_left[0].legend(loc="upper right", fontsize=8)
-    ax_left[0].grid(True)
-
-    ax_left[1].plot(t, dx, label="$\dot{x}$ [m/s]")
-    ax_left[1].plot(t, dy, label="$\dot{y}$ [m/s]")
-    ax_left[1].plot(t, dz, label="$\dot{z}$ [m/s]")
-    ax_left[1].set_ylabel("Inertial Vel.")
-    ax_left[1].legend(loc="upper right", fontsize=8)
-    ax_left[1].grid(True)
-
-    ax_left[2].plot(t, ddx, label="$\ddot{x}$ [m/s²]")
-    ax_left[2].plot(t, ddy, label="$\ddot{y}$ [m/s²]")
-    ax_left[2].plot(t, ddz, label="$\ddot{z}$ [m/s²]")
-    ax_left[2].set_ylabel("Inertial Acc.")
-    ax_left[2].legend(loc="upper right", fontsize=8)
-    ax_left[2].grid(True)
-    ax_left[2].set_xlabel("Time [s]")
+
+    # ================================================== #
+    #    Figure (pyplot only when it will be shown)
+    # ================================================== #
+    panels = _layout(channels)
+    n_cols = 2 if len(panels) > 3 else 1
+    n_rows = -(-len(panels) // n_cols)
+
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=figsize, dpi=dpi)
+    else:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize, dpi=dpi)
+    axes = fig.subplots(n_rows, n_cols, sharex=True, squeeze=False)
+    axes = axes.flatten(order="F")                       # column by column
+
+    # One decimation bin per horizontal pixel of an axis
+    n_bins = int(figsize[0] * dpi / n_cols) if decimate else None
 
 
 
     # ================================================= #
-    #    Right column: 
-    #    Euler angles, vel, and acc
+    #    Lines
     # ================================================= #
-    ax_right[0].plot(t, phi * rad2deg, label=  "phi [deg]")
-    ax_right[0].plot(t, theta * rad2deg, label="theta [deg]")
-    ax_right[0].plot(t, psi * rad2deg, label=  "psi [deg]")
-    ax_right[0].set_ylabel("Euler Angles")
-    ax_right[0].legend(loc="upper right", fontsize=8)
-    ax_right[0].grid(True)
-
-    ax_right[1].plot(t, p * rad2deg, label="p [deg/s]")
-    ax_right[1].plot(t, q * rad2deg, label="q [deg/s]")
-    ax_right[1].plot(t, r * rad2deg, label="r [deg/s]")
-    ax_right[1].set_ylabel("Body Rates")
-    ax_right[1].legend(loc="upper right", fontsize=8)
-    ax_right[1].grid(True)
-
-    ax_right[2].plot(t, dp * rad2deg, label="$\dot{p}$ [deg/s²]")
-    ax_right[2].plot(t, dq * rad2deg, label="$\dot{q}$ [deg/s²]")
-    ax_right[2].plot(t, dr * rad2deg, label="$\dot{r}$ [deg/s²]")
-    ax_right[2].set_ylabel("Body Acc.")
-    ax_right[2].legend(loc="upper right", fontsize=8)
-    ax_right[2].grid(True)
-    ax_right[2].set_xlabel("Time [s]")
+    t = np.asarray(results["t"])
+    for ax, (ylabel, lines) in zip(axes, panels):
+        for ch, label, scale in lines:
+            y = np.asarray(results[ch])
+            if n_bins is not None:
+                idx = minmax_indices(y, n_bins)
+                ax.plot(t[idx], y[idx] * scale, label=label)
+            else:
+                ax.plot(t, y * scale, label=label)
+        ax.set_ylabel(ylabel)
+        ax.legend(loc="upper right", fontsize=8)
+        ax.grid(True)
+
+    for ax in axes[len(panels):]:
+        ax.set_visible(False)
+    for c in range(n_cols):
+        axes[min((c + 1) * n_rows, len(panels)) - 1].set_xlabel("Time [s]")
 
     fig.suptitle("Quadrotor Dynamics\n", fontsize=16)
     fig.tight_layout()
-    plt.show()
 
+    if save is not None:
+        Path(save).parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(save)
+    if show:
+        plt.show()
+    return fig
@@ -0,0 +1,222 @@
+# ================================================== #
+#    Online ensemble statistics (Monte Carlo reducer)
+# -------------------------------------------------- #
+#  EnsembleStats folds runs into per-step, per-channel
+#  statistics as they finish, so memory is
+#  O(steps x channels) whatever the number of runs:
+#    mean / variance  Welford (Chan et al. for batches
+#                     and merges)
+#    min / max        envelope
+#    quantiles        QuantileSketch (KLL-style)
+#  add() takes a Logger / DataFrame (one run) or a
+#  Batch_Sim result ({channel: (n_steps, N)}); merge()
+#  combines reducers built in parallel workers.
+# ================================================== #
+import numpy as np
+
+from Data_Logger import CHANNELS, n_steps_for
+
+DEFAULT_CHANNELS = ["x", "y", "z", "phi", "theta", "psi"]
+
+
+
+# ================================================== #
+#    Streaming quantile sketch (KLL-style)
+# -------------------------------------------------- #
+#  One sketch per (step, channel) cell, stored as
+#  (..., items) arrays per level. Every cell sees the
+#  same number of values, so level sizes are shared
+#  and a compaction is one sort over all cells.
+#  Level h holds items of weight 2**h; when it reaches
+#  its capacity it is sorted and every other item (a
+#  random offset per cell) moves up a level.
+#  Capacities shrink by 2/3 per level below the top
+#  (min 8): about 1.3k items (~5 KB of buffers) per
+#  cell at k=128, independent of the run count.
+#  Rank error is a few percent at most at k=128 and
+#  falls roughly as 1/k; exact for fewer than k values.
+# ================================================== #
+class QuantileSketch:
+    def __init__(self, shape, k=128, seed=None):
+        self.shape = tuple(shape)
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self._levels = []                                # (shape + (size,)) buffers
+        self._counts = []                                # items in use per level
+
+    def _capacity(self, h):
+        return max(8, int(self.k * (2 / 3) ** (len(self._levels) - 1 - h)))
+
+    def _append(self, h, items):
+        # items: shape + (m,)
+        if h == len(self._levels):
+            self._levels.append(np.empty(self.shape + (0,)))
+            self._counts.append(0)
+        buf, n, m = self._levels[h], self._counts[h], items.shape[-1]
+        if n + m > buf.shape[-1]:
+            cap = self._capacity(h)
+            grown = np.empty(self.shape + (max(n + m, cap + cap // 2),))
+            grown[..., :n] = buf[..., :n]
+            self._levels[h] = buf = grown
+        buf[..., n:n + m] = items
+        self._counts[h] = n + m
+
+    def _compact(self, h):
+        buf, n = self._levels[h], self._counts[h]
+        even = n - n % 2
+        pairs = np.sort(buf[..., :even], axis=-1)
+        offset = self.rng.integers(0, 2, size=self.shape + (1,))
+        promoted = np.take_along_axis(pairs, offset + 2 * np.arange(even // 2), axis=-1)
+        buf[..., :n - even] = buf[..., even:n]           # odd item stays (newest)
+        self._counts[h] = n - even
+        cap = self._capacity(h)
+        if buf.shape[-1] > 2 * cap:                      # capacity shrank (level added above)
+            self._levels[h] = buf[..., :cap + cap // 2].copy()
+        self._append(h + 1, promoted)
+
+    def _compress(self):
+        h = 0
+        while h < len(self._levels):
+            if self._counts[h] >= self._capacity(h):
+                self._compact(h)
+                h = 0                                    # a new level shrinks the ones below
+            else:
+                h += 1
+
+    def update(self, values):
+        # values: shape (one value per cell) or shape + (N,)
+        values = np.asarray(values, dtype=float)
+        if values.shape == self.shape:
+            values = values[..., None]
+        self._append(0, values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.shape != self.shape or other.k != self.k:
+            raise ValueError("Can only merge sketches with the same shape and k")
+        for h, (buf, n) in enumerate(zip(other._levels, other._counts)):
+            if n:
+                self._append(h, buf[..., :n])
+        self._compress()
+        return self
+
+    @property
+    def weight(self):
+        return sum(n << h for h, n in enumerate(self._counts))
+
+    def quantile(self, q):
+        # q scalar -> shape; q sequence -> (len(q),) + shape
+        if not self.weight:
+            raise ValueError("Empty sketch")
+        values = np.concatenate([buf[..., :n] for buf, n in zip(self._levels, self._counts)], axis=-1)
+        weights = np.concatenate([np.full(n, 2.0**h) for h, n in enumerate(self._counts)])
+
+        order = np.argsort(values, axis=-1)
+        values = np.take_along_axis(values, order, axis=-1)
+        cum = np.cumsum(weights[order], axis=-1)
+
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        target = qs.reshape((-1,) + (1,) * (cum.ndim - 1)) * cum[..., -1]
+        idx = np.minimum((cum[None] < target[..., None]).sum(axis=-1), values.shape[-1] - 1)
+        out = np.take_along_axis(values[None], idx[..., None], axis=-1)[..., 0]
+        return out[0] if np.ndim(q) == 0 else out
+
+
+
+# ================================================== #
+#    Ensemble reducer
+# -------------------------------------------------- #
+#  Runs must all have n_steps rows (same t_tot / dt).
+#  Statistics are (n_steps, len(channels)) arrays in
+#  channel order; summary(channel) gives one channel.
+# ================================================== #
+class EnsembleStats:
+    def __init__(self, n_steps, channels=None, k=128, seed=None):
+        self.channels = list(DEFAULT_CHANNELS if channels is None else channels)
+        unknown = [c for c in self.channels if c not in CHANNELS]
+        if unknown:
+            raise KeyError(f"Unknown channel(s): {unknown}")
+
+        self.n_steps = n_steps
+        shape = (n_steps, len(self.channels))
+        self.count = 0
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self.sketch = QuantileSketch(shape, k, seed)
+        self.t = None
+
+    @classmethod
+    def for_run(cls, t_tot, dt, channels=None, k=128, seed=None):
+        return cls(n_steps_for(t_tot, dt), channels, k, seed)
+
+    # ================================================== #
+    #    Fold in runs
+    # ================================================== #
+    def add(self, results):
+        X = np.stack([np.asarray(results[c], dtype=float) for c in self.channels], axis=1)
+        if X.shape[0] != self.n_steps:
+            raise ValueError(f"Run has {X.shape[0]} steps, expected {self.n_steps}")
+        if X.ndim == 2:
+            X = X[..., None]                             # one run
+        if self.t is None and "t" in results:
+            self.t = np.array(results["t"], dtype=float)
+
+        n_b = X.shape[-1]
+        mean_b = X.mean(axis=-1)
+        m2_b = ((X - mean_b[..., None]) ** 2).sum(axis=-1)
+        self._combine(n_b, mean_b, m2_b)
+        np.minimum(self.min, X.min(axis=-1), out=self.min)
+        np.maximum(self.max, X.max(axis=-1), out=self.max)
+        self.sketch.update(X)
+        return self
+
+    def _combine(self, n_b, mean_b, m2_b):
+        # Chan et al.; with n_b = 1 this is Welford's update
+        n = self.count + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * (n_b / n)
+        self._m2 += m2_b + delta**2 * (self.count * n_b / n)
+        self.count = n
+
+    def merge(self, other):
+        if other.channels != self.channels or other.n_steps != self.n_steps:
+            raise ValueError("Can only merge reducers with the same channels and n_steps")
+        if not other.count:
+            return self
+        self._combine(other.count, other._mean, other._m2)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        self.sketch.merge(other.sketch)
+        if self.t is None:
+            self.t = other.t
+        return self
+
+    # ================================================== #
+    #    Results
+    # ================================================== #
+    @property
+    def mean(self):
+        return self._mean
+
+    def variance(self, ddof=1):
+        if self.count <= ddof:
+            return np.full_like(self._m2, np.nan)
+        return self._m2 / (self.count - ddof)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance())
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def summary(self, channel, q=(0.05, 0.5, 0.95)):
+        j = self.channels.index(channel)
+        out = {"t": self.t, "mean": self._mean[:, j], "std": self.std[:, j],
+               "min": self.min[:, j], "max": self.max[:, j]}
+        for qi, values in zip(q, self.quantile(q)):
+            out[f"p{100 * qi:g}"] = values[:, j]
+        return out
@@ -0,0 +1,263 @@
+# ================================================== #
+#    Integrators for the 12-state dynamics
+# ================================================== #
+import numpy as np
+
+from Kinematics import quat_normalize, quat_rates, quat_thrust_axis
+
+# ================================================== #
+#    State layout (axis 0, so (12,) or (12, N))
+#    x, y, z, dx, dy, dz, phi, theta, psi, p, q, r
+# -------------------------------------------------- #
+#  Quaternion attitude (13 states):
+#    x, y, z, dx, dy, dz, q0, q1, q2, q3, p, q, r
+# ================================================== #
+POS, VEL, ANG, RATE = slice(0, 3), slice(3, 6), slice(6, 9), slice(9, 12)
+QUAT, QRATE = slice(6, 10), slice(10, 13)
+
+METHODS = ["euler", "semi_implicit", "rk4", "rk45"]
+ATTITUDES = ["euler", "quaternion"]
+
+
+
+# ================================================== #
+#    Forces and moments from motor speeds
+# -------------------------------------------------- #
+#  P: dict with m, I_x, I_y, I_z, l_x, l_y, c_T,
+#     c_RD, g  (scalars or (N,) arrays)
+# ================================================== #
+def forces_moments(omega, P):
+    w1, w2, w3, w4 = omega[0]**2, omega[1]**2, omega[2]**2, omega[3]**2
+    F_T = P["c_T"] * (w1 + w2 + w3 + w4)
+    M_x = P["l_y"] * P["c_T"] * (-w1 + w2 + w3 - w4)
+    M_y = P["l_x"] * P["c_T"] * (-w1 - w2 + w3 + w4)
+    M_z = P["c_RD"] * (w1 - w2 + w3 - w4)
+    return F_T, M_x, M_y, M_z
+
+
+def euler_rates(phi, theta, p, q, r):
+    s_phi, c_phi = np.sin(phi), np.cos(phi)
+    dphi = p + (s_phi * q + c_phi * r) * np.tan(theta)
+    dtheta = c_phi * q - s_phi * r
+    dpsi = (s_phi * q + c_phi * r) / np.cos(theta)
+    return dphi, dtheta, dpsi
+
+
+def derivatives(s, omega, P):
+    x, y, z, dx, dy, dz, phi, theta, psi, p, q, r = s
+    F_T, M_x, M_y, M_z = forces_moments(omega, P)
+    m = P["m"]
+
+    ddx = (F_T / m) * (np.cos(psi) * np.sin(theta) * np.cos(phi) + np.sin(psi) * np.sin(phi))
+    ddy = (F_T / m) * (np.sin(psi) * np.sin(theta) * np.cos(phi) - np.cos(psi) * np.sin(phi))
+    ddz = -P["g"] + (F_T / m) * (np.cos(theta) * np.cos(phi))
+
+    dphi, dtheta, dpsi = euler_rates(phi, theta, p, q, r)
+    dp, dq, dr = body_accelerations(p, q, r, M_x, M_y, M_z, P)
+
+    return np.array([dx, dy, dz, ddx, ddy, ddz, dphi, dtheta, dpsi, dp, dq, dr])
+
+
+def body_accelerations(p, q, r, M_x, M_y, M_z, P):
+    I_x, I_y, I_z = P["I_x"], P["I_y"], P["I_z"]
+    dp = (((I_y - I_z) * q * r) / I_x) + (M_x / I_x)
+    dq = (((I_z - I_x) * p * r) / I_y) + (M_y / I_y)
+    dr = (((I_x - I_y) * p * q) / I_z) + (M_z / I_z)
+    return dp, dq, dr
+
+
+def derivatives_quat(s, omega, P):
+    # No tan/cos(theta) terms, so nothing stiff near +-90 deg pitch;
+    # the thrust axis comes straight from the quaternion
+    dx, dy, dz = s[VEL]
+    p, q, r = s[QRATE]
+    F_T, M_x, M_y, M_z = forces_moments(omega, P)
+    a_T = F_T / P["m"]
+    b_x, b_y, b_z = quat_thrust_axis(s[QUAT])
+    dp, dq, dr = body_accelerations(p, q, r, M_x, M_y, M_z, P)
+
+    return np.array([dx, dy, dz,
+                     a_T * b_x, a_T * b_y, a_T * b_z - P["g"],
+                     *quat_rates(s[QUAT], p, q, r),
+                     dp, dq, dr])
+
+
+def normalize_quat_state(s):
+    s[QUAT] = quat_normalize(s[QUAT])
+    return s
+
+
+
+# ================================================== #
+#    Fixed-step steppers
+# -------------------------------------------------- #
+#  f(s) -> ds with the motor input held for the step
+# ================================================== #
+def step_euler(f, s, h):
+    return s + h * f(s)
+
+
+def step_semi_implicit(f, s, h):
+    # Same update order as the X_Quad.model() loop:
+    # velocities and body rates first, then positions and
+    # Euler angles from the updated values
+    d = f(s)
+    s = s.copy()
+    s[VEL] += h * d[VEL]
+    s[RATE] += h * d[RATE]
+    s[POS] += h * s[VEL]
+    s[ANG] += h * np.array(euler_rates(s[6], s[7], s[9], s[10], s[11]))
+    return s
+
+
+def step_semi_implicit_quat(f, s, h):
+    d = f(s)
+    s = s.copy()
+    s[VEL] += h * d[VEL]
+    s[QRATE] += h * d[QRATE]
+    s[POS] += h * s[VEL]
+    s[QUAT] += h * quat_rates(s[QUAT], s[10], s[11], s[12])
+    return s
+
+
+def step_rk4(f, s, h):
+    k1 = f(s)
+    k2 = f(s + 0.5 * h * k1)
+    k3 = f(s + 0.5 * h * k2)
+    k4 = f(s + h * k3)
+    return s + (h / 6) * (k1 + 2*k2 + 2*k3 + k4)
+
+
+STEPPERS = {
+    "euler": step_euler,
+    "semi_implicit": step_semi_implicit,
+    "rk4": step_rk4,
+}
+
+QUAT_STEPPERS = {**STEPPERS, "semi_implicit": step_semi_implicit_quat}
+
+
+
+# ================================================== #
+#    Dormand-Prince 5(4) tableau + dense output
+# ================================================== #
+DP_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+]
+DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+DP_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+
+def _dp_step(f, s, k1, h):
+    K = [k1]
+    for a in DP_A[1:]:
+        K.append(f(s + h * sum(a_j * k_j for a_j, k_j in zip(a, K))))
+    s_new = s + h * sum(b * k for b, k in zip(DP_B, K))
+    K.append(f(s_new))                                   # FSAL
+    K = np.array(K)
+    err = h * np.tensordot(DP_E, K, axes=1)
+    return s_new, K, err
+
+
+def _dp_dense(s, K, h, x):
+    # Continuous extension at s(t + x*h), 0 <= x <= 1
+    Q = np.tensordot(K, DP_P, axes=([0], [0]))           # (..., 4)
+    return s + h * (Q @ (x ** np.arange(1, 5)))
+
+
+
+# ================================================== #
+#    Integrate
+# -------------------------------------------------- #
+#  rhs(s, omega)  -> ds
+#  u_fn(t)        -> omega, held piecewise constant
+#  t_eval         -> output times (t_eval[0] is the
+#                    start, s0 is the state there)
+#  Fixed-step methods take h-sized sub-steps inside
+#  each output interval, holding u_fn(step start).
+#  rk45 integrates between input breaks with error
+#  control and interpolates at t_eval (dense output).
+#  attitude="quaternion" expects the 13-state layout
+#  and renormalizes q after every step (project).
+#  Returns (len(t_eval), *s0.shape).
+# ================================================== #
+def integrate(rhs, s0, t_eval, u_fn, method="rk4", h=None, breaks=(),
+              rtol=1e-6, atol=1e-9, h_max=np.inf, attitude="euler", project=None):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (have {METHODS})")
+    if attitude not in ATTITUDES:
+        raise ValueError(f"Unknown attitude '{attitude}' (have {ATTITUDES})")
+    if attitude == "quaternion" and project is None:
+        project = normalize_quat_state
+
+    t_eval = np.asarray(t_eval, dtype=float)
+    out = np.empty((len(t_eval),) + np.shape(s0))
+    s = np.array(s0, dtype=float)
+    out[0] = s
+
+    if method != "rk45":
+        step = (QUAT_STEPPERS if attitude == "quaternion" else STEPPERS)[method]
+        for k in range(1, len(t_eval)):
+            a, b = t_eval[k-1], t_eval[k]
+            n_sub = 1 if h is None else max(1, int(np.ceil((b - a) / h - 1e-9)))
+            hh = (b - a) / n_sub
+            for i in range(n_sub):
+                omega = u_fn(a + i * hh)
+                s = step(lambda s_: rhs(s_, omega), s, hh)
+                if project is not None:
+                    s = project(s)
+            out[k] = s
+        return out
+
+    return _integrate_rk45(rhs, s, t_eval, u_fn, out, h, breaks, rtol, atol, h_max, project)
+
+
+def _integrate_rk45(rhs, s, t_eval, u_fn, out, h, breaks, rtol, atol, h_max, project):
+    t0, t1 = t_eval[0], t_eval[-1]
+    edges = np.unique(np.concatenate([[t0, t1], np.asarray(breaks, dtype=float)]))
+    edges = edges[(edges >= t0) & (edges <= t1)]
+    h = (t_eval[1] - t0) if (h is None and len(t_eval) > 1) else (h or 1e-3)
+    k = 1
+
+    for a, b in zip(edges[:-1], edges[1:]):
+        omega = u_fn(0.5 * (a + b))                      # constant on [a, b)
+        f = lambda s_: rhs(s_, omega)
+        t = a
+        k1 = f(s)
+        while t < b:
+            h = min(h, h_max, b - t)
+            s_new, K, err = _dp_step(f, s, k1, h)
+            scale = atol + rtol * np.maximum(np.abs(s), np.abs(s_new))
+            err_norm = np.sqrt(np.mean((err / scale) ** 2))
+
+            if err_norm > 1:
+                h *= max(0.2, 0.9 * err_norm ** -0.2)
+                continue
+
+            # Dense output for every t_eval inside (t, t + h]
+            while k < len(t_eval) and t_eval[k] <= t + h:
+                out[k] = _dp_dense(s, K, h, (t_eval[k] - t) / h)
+                k += 1
+
+            t = b if b - (t + h) < 1e-12 * max(1.0, abs(b)) else t + h
+            s, k1 = s_new, K[-1]
+            if project is not None:
+                s = project(s)
+            h *= min(10.0, 0.9 * err_norm ** -0.2) if err_norm > 0 else 10.0
+
+    out[k:] = s                                          # round-off at t_eval[-1]
+    return out
@@ -0,0 +1,155 @@
+# ================================================== #
+#    Compiled (Numba) propagation loop
+# -------------------------------------------------- #
+#  Runs the whole X_Quad.model() time loop over a
+#  precomputed (n_steps, 4) motor command array in
+#  nopython mode. Same update order as the reference
+#  loop; rows are written in Data_Logger.CHANNELS
+#  order. Without Numba, model(backend="numba") falls
+#  back to the pure-Python loop.
+# -------------------------------------------------- #
+#  state (15,) carries x..r (Integrators layout) plus
+#  the previous Euler rates between calls, so a long
+#  run can be propagated block by block.
+# ================================================== #
+import importlib.util
+import math
+import numpy as np
+
+from Data_Logger import CHANNELS
+
+# Checked without importing Numba (~0.3 s); callers
+# import this module only when they compile
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+
+if HAVE_NUMBA:
+    from numba import njit
+else:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+
+@njit(cache=True, fastmath=False)
+def propagate(t_vec, U, dt, g, m, I_x, I_y, I_z, l_x, l_y, c_T, c_RD, state, out):
+    x, y, z = state[0], state[1], state[2]
+    dx, dy, dz = state[3], state[4], state[5]
+    phi, theta, psi = state[6], state[7], state[8]
+    p, q, r = state[9], state[10], state[11]
+    prev_dphi, prev_dtheta, prev_dpsi = state[12], state[13], state[14]
+
+    for k in range(t_vec.shape[0]):
+        omega_1, omega_2, omega_3, omega_4 = U[k, 0], U[k, 1], U[k, 2], U[k, 3]
+
+        F_T = c_T * (omega_1**2 + omega_2**2 + omega_3**2 + omega_4**2)
+        M_x = l_y * c_T * (-omega_1**2 + omega_2**2 + omega_3**2 - omega_4**2)
+        M_y = l_x * c_T * (-omega_1**2 - omega_2**2 + omega_3**2 + omega_4**2)
+        M_z = c_RD * (omega_1**2 - omega_2**2 + omega_3**2 - omega_4**2)
+
+        # ================================================= #
+        #    Rotation (sin/cos once per step)
+        # ================================================= #
+        s_phi, c_phi = math.sin(phi), math.cos(phi)
+        s_th, c_th = math.sin(theta), math.cos(theta)
+        s_psi, c_psi = math.sin(psi), math.cos(psi)
+        t_th = s_th / c_th
+
+        r00, r01, r02 = c_psi * c_th, c_psi * s_th * s_phi - s_psi * c_phi, c_psi * s_th * c_phi + s_psi * s_phi
+        r10, r11, r12 = s_psi * c_th, s_psi * s_th * s_phi + c_psi * c_phi, s_psi * s_th * c_phi - c_psi * s_phi
+        r20, r21, r22 = -s_th, c_th * s_phi, c_th * c_phi
+
+        # ================================================= #
+        #    Inertial frame linear dynamics
+        # ================================================= #
+        ddx = (F_T / m) * r02
+        ddy = (F_T / m) * r12
+        ddz = -g + (F_T / m) * r22
+        dx += ddx * dt
+        dy += ddy * dt
+        dz += ddz * dt
+        x += dx * dt
+        y += dy * dt
+        z += dz * dt
+
+        # ================================================= #
+        #    Body frame linear dynamics
+        # ================================================= #
+        u = r00 * dx + r01 * dy + r02 * dz
+        v = r10 * dx + r11 * dy + r12 * dz
+        w = r20 * dx + r21 * dy + r22 * dz
+        du = r00 * ddx + r01 * ddy + r02 * ddz
+        dv = r10 * ddx + r11 * ddy + r12 * ddz
+        dw = r20 * ddx + r21 * ddy + r22 * ddz
+
+        # ================================================= #
+        #    Body frame angular dynamics
+        # ================================================= #
+        dp = (((I_y - I_z) * q * r) / I_x) + (M_x / I_x)
+        dq = (((I_z - I_x) * p * r) / I_y) + (M_y / I_y)
+        dr = (((I_x - I_y) * p * q) / I_z) + (M_z / I_z)
+        p += dp * dt
+        q += dq * dt
+        r += dr * dt
+
+        # ================================================= #
+        #    Inertial angular dynamics
+        # ================================================= #
+        dphi = p + (s_phi * t_th) * q + (c_phi * t_th) * r
+        dtheta = c_phi * q + (-s_phi) * r
+        dpsi = (s_phi / c_th) * q + (c_phi / c_th) * r
+        ddphi = (dphi - prev_dphi) / dt
+        ddtheta = (dtheta - prev_dtheta) / dt
+        ddpsi = (dpsi - prev_dpsi) / dt
+        phi += dphi * dt
+        theta += dtheta * dt
+        psi += dpsi * dt
+        prev_dphi, prev_dtheta, prev_dpsi = dphi, dtheta, dpsi
+
+        # ================================================= #
+        #    Log step (CHANNELS order)
+        # ================================================= #
+        row = out[k]
+        row[0] = t_vec[k]
+        row[1], row[2], row[3] = x, y, z
+        row[4], row[5], row[6] = dx, dy, dz
+        row[7], row[8], row[9] = ddx, ddy, ddz
+        row[10], row[11], row[12] = u, v, w
+        row[13], row[14], row[15] = du, dv, dw
+        row[16], row[17], row[18] = phi, theta, psi
+        row[19], row[20], row[21] = dphi, dtheta, dpsi
+        row[22], row[23], row[24] = ddphi, ddtheta, ddpsi
+        row[25], row[26], row[27] = p, q, r
+        row[28], row[29], row[30] = dp, dq, dr
+        row[31], row[32], row[33], row[34] = omega_1, omega_2, omega_3, omega_4
+        row[35], row[36], row[37], row[38] = F_T, M_x, M_y, M_z
+
+    state[0], state[1], state[2] = x, y, z
+    state[3], state[4], state[5] = dx, dy, dz
+    state[6], state[7], state[8] = phi, theta, psi
+    state[9], state[10], state[11] = p, q, r
+    state[12], state[13], state[14] = prev_dphi, prev_dtheta, prev_dpsi
+    return out
+
+
+def run(t_vec, U, dt, g, m, I_x, I_y, I_z, l_x, l_y, c_T, c_RD, state=None, out=None):
+    if state is None:
+        state = np.zeros(15)
+    if out is None:
+        out = np.empty((len(t_vec), len(CHANNELS)))
+    return propagate(np.ascontiguousarray(t_vec, dtype=np.float64),
+                     np.ascontiguousarray(U, dtype=np.float64),
+                     float(dt), float(g), float(m), float(I_x), float(I_y), float(I_z),
+                     float(l_x), float(l_y), float(c_T), float(c_RD), state, out)
+
+
+
+# ================================================== #
+#    Parity check against the reference Python loop
+# ================================================== #
+def parity(**model_kwargs):
+    import X_Quad as XQ
+    ref = XQ.model(backend="python", **model_kwargs)
+    fast = XQ.model(backend="numba", **model_kwargs)
+    return float(np.max(np.abs(ref.values - fast.values)))
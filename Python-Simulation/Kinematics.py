@@ -0,0 +1,151 @@
+# ================================================== #
+#    Attitude kinematics
+# ================================================== #
+import math
+import numpy as np
+
+# ================================================== #
+#    Quaternions (scalar first, components on axis 0
+#    so q is (4,), (4, N) or (4, n_steps))
+# -------------------------------------------------- #
+#  Same Z-Y-X convention as Inertial2Body:
+#    q = q_z(psi) * q_y(theta) * q_x(phi)
+# ================================================== #
+def euler2quat(phi, theta, psi):
+    c_phi, s_phi = np.cos(phi / 2), np.sin(phi / 2)
+    c_th, s_th = np.cos(theta / 2), np.sin(theta / 2)
+    c_psi, s_psi = np.cos(psi / 2), np.sin(psi / 2)
+    return np.array([
+        c_psi * c_th * c_phi + s_psi * s_th * s_phi,
+        c_psi * c_th * s_phi - s_psi * s_th * c_phi,
+        c_psi * s_th * c_phi + s_psi * c_th * s_phi,
+        s_psi * c_th * c_phi - c_psi * s_th * s_phi,
+    ])
+
+
+def quat2euler(q, unwrap=False):
+    q0, q1, q2, q3 = q
+    phi = np.arctan2(2 * (q0 * q1 + q2 * q3), 1 - 2 * (q1**2 + q2**2))
+    theta = np.arcsin(np.clip(2 * (q0 * q2 - q3 * q1), -1.0, 1.0))
+    psi = np.arctan2(2 * (q0 * q3 + q1 * q2), 1 - 2 * (q2**2 + q3**2))
+    if unwrap:
+        # Time series on the last axis: remove +-pi jumps so
+        # phi/psi read like the Euler-propagated channels
+        phi, psi = np.unwrap(phi), np.unwrap(psi)
+    return phi, theta, psi
+
+
+def quat_normalize(q):
+    return q / np.sqrt(q[0]**2 + q[1]**2 + q[2]**2 + q[3]**2)
+
+
+def quat_thrust_axis(q):
+    # Third column of the body -> inertial rotation (body z)
+    q0, q1, q2, q3 = q
+    return (2 * (q1 * q3 + q0 * q2),
+            2 * (q2 * q3 - q0 * q1),
+            1 - 2 * (q1**2 + q2**2))
+
+
+def quat_rates(q, p, q_, r):
+    # dq/dt = 1/2 q (x) [0, p, q, r]
+    q0, q1, q2, q3 = q
+    return np.array([
+        0.5 * (-q1 * p - q2 * q_ - q3 * r),
+        0.5 * ( q0 * p + q2 * r - q3 * q_),
+        0.5 * ( q0 * q_ - q1 * r + q3 * p),
+        0.5 * ( q0 * r + q1 * q_ - q2 * p),
+    ])
+
+
+
+# ================================================== #
+#    Rotation kernel (scalar, one vehicle)
+# -------------------------------------------------- #
+#  update() computes the six sin/cos values once per
+#  step and keeps the entries of R (body -> inertial,
+#  R_3 R_2 R_1) and E (body rates -> Euler rates) as
+#  two float tuples; rotate()/euler_rates() work on
+#  plain floats. The R / E arrays are built on demand.
+# ================================================== #
+class RotationKernel:
+    def __init__(self):
+        self._r = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+        self._e = self._r
+
+    def update(self, phi, theta, psi):
+        s_phi, c_phi = math.sin(phi), math.cos(phi)
+        s_th, c_th = math.sin(theta), math.cos(theta)
+        s_psi, c_psi = math.sin(psi), math.cos(psi)
+        t_th = s_th / c_th
+
+        self._r = (
+            c_psi * c_th, c_psi * s_th * s_phi - s_psi * c_phi, c_psi * s_th * c_phi + s_psi * s_phi,
+            s_psi * c_th, s_psi * s_th * s_phi + c_psi * c_phi, s_psi * s_th * c_phi - c_psi * s_phi,
+                   -s_th,                        c_th * s_phi,                        c_th * c_phi,
+        )
+        self._e = (
+            1.0, s_phi * t_th, c_phi * t_th,
+            0.0,        c_phi,       -s_phi,
+            0.0, s_phi / c_th, c_phi / c_th,
+        )
+        return self
+
+    @property
+    def R(self):
+        return np.array(self._r).reshape(3, 3)
+
+    @property
+    def E(self):
+        return np.array(self._e).reshape(3, 3)
+
+    @property
+    def thrust_axis(self):
+        # Body z in the inertial frame (third column of R)
+        r = self._r
+        return r[2], r[5], r[8]
+
+    def rotate(self, *vecs):
+        r00, r01, r02, r10, r11, r12, r20, r21, r22 = self._r
+        return tuple((r00 * x + r01 * y + r02 * z,
+                      r10 * x + r11 * y + r12 * z,
+                      r20 * x + r21 * y + r22 * z) for x, y, z in vecs)
+
+    def euler_rates(self, p, q, r):
+        _, e01, e02, _, e11, e12, _, e21, e22 = self._e
+        return (p + e01 * q + e02 * r,
+                e11 * q + e12 * r,
+                e21 * q + e22 * r)
+
+
+
+# ================================================== #
+#    Batched rotations, (N,) angles and (N, 3) vectors
+# -------------------------------------------------- #
+#  Pass out= buffers to reuse them between steps.
+# ================================================== #
+def rotation_matrices(phi, theta, psi, out=None):
+    phi, theta, psi = np.asarray(phi), np.asarray(theta), np.asarray(psi)
+    if out is None:
+        out = np.empty(phi.shape + (3, 3))
+    s_phi, c_phi = np.sin(phi), np.cos(phi)
+    s_th, c_th = np.sin(theta), np.cos(theta)
+    s_psi, c_psi = np.sin(psi), np.cos(psi)
+
+    out[..., 0, 0] = c_psi * c_th
+    out[..., 0, 1] = c_psi * s_th * s_phi - s_psi * c_phi
+    out[..., 0, 2] = c_psi * s_th * c_phi + s_psi * s_phi
+    out[..., 1, 0] = s_psi * c_th
+    out[..., 1, 1] = s_psi * s_th * s_phi + c_psi * c_phi
+    out[..., 1, 2] = s_psi * s_th * c_phi - c_psi * s_phi
+    out[..., 2, 0] = -s_th
+    out[..., 2, 1] = c_th * s_phi
+    out[..., 2, 2] = c_th * c_phi
+    return out
+
+
+def rotate_batch(R, *vecs, out=None):
+    # R: (N, 3, 3), each vec: (N, 3) -> tuple of (N, 3)
+    if out is None:
+        out = [None] * len(vecs)
+    return tuple(np.einsum("nij,nj->ni", R, v, out=o) for v, o in zip(vecs, out))
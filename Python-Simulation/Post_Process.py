@@ -0,0 +1,124 @@
+# ================================================== #
+#    Derived channels from the propagated core state
+# -------------------------------------------------- #
+#  The model() loop logs only CORE (time, the 12
+#  states and the motor speeds). Everything else is
+#  rebuilt here in one vectorized pass, with the same
+#  timing as the loop: step k uses the pre-update
+#  angles/rates (row k-1, zeros before the first row),
+#  except dphi/dtheta/dpsi, which use the updated
+#  p, q, r with the pre-update angles.
+#  derive_states() is the same pass for the other
+#  paths (integrate(), closed loop), where every
+#  channel is evaluated at the logged state itself.
+# ================================================== #
+import numpy as np
+
+from Data_Logger import CORE
+from Integrators import derivatives, forces_moments, body_accelerations, VEL, ANG, RATE
+from Kinematics import rotation_matrices
+
+_c = {name: i for i, name in enumerate(CORE)}
+
+
+
+def _lagged(a):
+    # Row k -> value at row k-1 (0 before the first row)
+    out = np.empty_like(a)
+    out[0] = 0.0
+    out[1:] = a[:-1]
+    return out
+
+
+def _rotate(R, x, y, z):
+    # Row-wise R @ (x, y, z) for R (n, 3, 3)
+    return tuple(R[:, i, 0] * x + R[:, i, 1] * y + R[:, i, 2] * z for i in range(3))
+
+
+def derive(core, P, dt, rotor=None):
+    # core: (n, len(CORE)) in CORE order; P as in model();
+    # rotor: the Rotor_Model.RotorModel of the run, if any
+    col = lambda name: core[:, _c[name]]
+    m, g = P["m"], P["g"]
+
+    # ================================================= #
+    #    Motor forces / moments
+    # ================================================= #
+    omega = np.array([col(f"omega_{i}") for i in range(1, 5)])
+    if rotor is not None:
+        F_T, M_x, M_y, M_z = rotor.forces_moments(omega, P)
+    else:
+        F_T, M_x, M_y, M_z = forces_moments(omega, P)
+
+    # ================================================= #
+    #    Rotation at the pre-update angles
+    # ================================================= #
+    phi, theta, psi = (_lagged(col(a)) for a in ("phi", "theta", "psi"))
+    R = rotation_matrices(phi, theta, psi)
+
+    # ================================================= #
+    #    Linear accelerations, body frame
+    # ================================================= #
+    ddx = (F_T / m) * R[:, 0, 2]
+    ddy = (F_T / m) * R[:, 1, 2]
+    ddz = -g + (F_T / m) * R[:, 2, 2]
+
+    u, v, w = _rotate(R, col("dx"), col("dy"), col("dz"))
+    du, dv, dw = _rotate(R, ddx, ddy, ddz)
+
+    # ================================================= #
+    #    Angular accelerations, Euler rates
+    # ================================================= #
+    p0, q0, r0 = (_lagged(col(a)) for a in ("p", "q", "r"))
+    dp, dq, dr = body_accelerations(p0, q0, r0, M_x, M_y, M_z, P)
+
+    # Same E matrix as Kinematics.RotationKernel
+    s_phi, c_phi = np.sin(phi), np.cos(phi)
+    c_th = np.cos(theta)
+    t_th = np.sin(theta) / c_th
+    p, q, r = col("p"), col("q"), col("r")
+    dphi = p + (s_phi * t_th) * q + (c_phi * t_th) * r
+    dtheta = c_phi * q + (-s_phi) * r
+    dpsi = (s_phi / c_th) * q + (c_phi / c_th) * r
+
+    ddphi = (dphi - _lagged(dphi)) / dt
+    ddtheta = (dtheta - _lagged(dtheta)) / dt
+    ddpsi = (dpsi - _lagged(dpsi)) / dt
+
+    return {
+        "ddx": ddx, "ddy": ddy, "ddz": ddz,
+        "u": u, "v": v, "w": w,
+        "du": du, "dv": dv, "dw": dw,
+        "dphi": dphi, "dtheta": dtheta, "dpsi": dpsi,
+        "ddphi": ddphi, "ddtheta": ddtheta, "ddpsi": ddpsi,
+        "dp": dp, "dq": dq, "dr": dr,
+        "F_T": F_T, "M_x": M_x, "M_y": M_y, "M_z": M_z,
+    }
+
+
+
+def derive_states(core, P, dt):
+    # Same channels for the integrate() / closed-loop
+    # paths: derivatives at each logged state and input
+    # (no lag), Euler accelerations by backward difference
+    S, U = core[:, 1:13].T, core[:, 13:17].T             # CORE: t, 12 states, 4 speeds
+    d = derivatives(S, U, P)
+    R = rotation_matrices(*S[ANG])
+
+    ddx, ddy, ddz = d[VEL]
+    u, v, w = _rotate(R, *S[VEL])
+    du, dv, dw = _rotate(R, *d[VEL])
+    dphi, dtheta, dpsi = d[ANG]
+    ddphi, ddtheta, ddpsi = (d[ANG] - _lagged(d[ANG].T).T) / dt
+    dp, dq, dr = d[RATE]
+    F_T, M_x, M_y, M_z = forces_moments(U, P)
+
+    return {
+        "ddx": ddx, "ddy": ddy, "ddz": ddz,
+        "u": u, "v": v, "w": w,
+        "du": du, "dv": dv, "dw": dw,
+        "dphi": dphi, "dtheta": dtheta, "dpsi": dpsi,
+        "ddphi": ddphi, "ddtheta": ddtheta, "ddpsi": ddpsi,
+        "dp": dp, "dq": dq, "dr": dr,
+        "F_T": F_T, "M_x": M_x, "M_y": M_y, "M_z": M_z,
+    }
@@ -0,0 +1,145 @@
+# ================================================== #
+#    Opt-in per-phase profiling for model()
+# -------------------------------------------------- #
+#  prof = Profiler()
+#  logs = model(profiler=prof)
+#  prof.print_report()
+#  prof.to_chrome_trace("trace.json")    (chrome://tracing, Perfetto)
+#  prof.to_speedscope("model.speedscope.json")
+#
+#  The reference loop stores raw perf_counter_ns marks
+#  (one int64 row per step); everything else is done
+#  after the run. With profiler=None the loop only
+#  pays a few "is not None" checks per step.
+# ================================================== #
+import json
+import time
+import numpy as np
+from pathlib import Path
+
+# Phases of one reference-loop step, in order
+PHASES = ["motor", "rotation", "translational", "angular", "logging"]
+
+clock = time.perf_counter_ns
+
+
+
+class Profiler:
+    def __init__(self, phases=PHASES):
+        self.phases = list(phases)
+        self.marks = np.empty((0, len(self.phases) + 1), dtype=np.int64)
+        self.n = 0
+        self.spans = []                                  # (name, t0_ns, t1_ns)
+        self.counters = {}
+
+    # ================================================== #
+    #    Recording (called from model())
+    # ================================================== #
+    def start(self, n_steps):
+        self.marks = np.empty((n_steps, len(self.phases) + 1), dtype=np.int64)
+        self.n = 0
+
+    def record(self, marks):
+        self.marks[self.n] = marks
+        self.n += 1
+
+    def span(self, name, t0, t1):
+        self.spans.append((name, t0, t1))
+
+    def count(self, name, k=1):
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    # ================================================== #
+    #    Aggregates
+    # ================================================== #
+    @property
+    def durations(self):
+        # (n_steps, n_phases) [ns]
+        return np.diff(self.marks[:self.n], axis=1)
+
+    def report(self):
+        out = {"steps": self.n, "phases": {}, "spans": {}, "counters": dict(self.counters)}
+        if self.n:
+            d = self.durations
+            step = d.sum(axis=1)
+            out["step"] = {
+                "mean_us": float(step.mean() / 1e3),
+                "p50_us": float(np.percentile(step, 50) / 1e3),
+                "p99_us": float(np.percentile(step, 99) / 1e3),
+                "max_us": float(step.max() / 1e3),
+            }
+            total = max(step.sum(), 1)
+            for i, phase in enumerate(self.phases):
+                out["phases"][phase] = {
+                    "total_ms": float(d[:, i].sum() / 1e6),
+                    "mean_us": float(d[:, i].mean() / 1e3),
+                    "p99_us": float(np.percentile(d[:, i], 99) / 1e3),
+                    "share": float(d[:, i].sum() / total),
+                }
+        for name, t0, t1 in self.spans:
+            out["spans"][name] = out["spans"].get(name, 0.0) + (t1 - t0) / 1e6
+        return out
+
+    def print_report(self):
+        rep = self.report()
+        if "step" in rep:
+            s = rep["step"]
+            print(f"{rep['steps']} steps: mean {s['mean_us']:.2f} us, "
+                  f"p50 {s['p50_us']:.2f} us, p99 {s['p99_us']:.2f} us, max {s['max_us']:.2f} us")
+            for phase, p in rep["phases"].items():
+                print(f"  {phase:<14}{p['total_ms']:>10.2f} ms{p['mean_us']:>9.2f} us"
+                      f"{p['p99_us']:>9.2f} us (p99){p['share']:>8.1%}")
+        for name, ms in rep["spans"].items():
+            print(f"  [{name}]{ms:>10.2f} ms")
+        for name, k in rep["counters"].items():
+            print(f"  #{name}: {k}")
+
+    # ================================================== #
+    #    Exports
+    # -------------------------------------------------- #
+    #  max_steps limits the per-step events written
+    # ================================================== #
+    def _origin(self):
+        starts = [m[0] for m in self.marks[:1]] + [s[1] for s in self.spans]
+        return min(starts) if starts else 0
+
+    def to_chrome_trace(self, path, max_steps=20000):
+        t_ref = self._origin()
+        events = []
+        for name, t0, t1 in self.spans:
+            events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                           "ts": (t0 - t_ref) / 1e3, "dur": (t1 - t0) / 1e3})
+        for k, row in enumerate(self.marks[:min(self.n, max_steps)]):
+            events.append({"name": "step", "ph": "X", "pid": 0, "tid": 1,
+                           "ts": (row[0] - t_ref) / 1e3, "dur": (row[-1] - row[0]) / 1e3,
+                           "args": {"k": k}})
+            for i, phase in enumerate(self.phases):
+                events.append({"name": phase, "ph": "X", "pid": 0, "tid": 1,
+                               "ts": (row[i] - t_ref) / 1e3, "dur": (row[i + 1] - row[i]) / 1e3})
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ns"}))
+        return path
+
+    def to_speedscope(self, path, max_steps=20000):
+        t_ref = self._origin()
+        names = ["step"] + self.phases + sorted({s[0] for s in self.spans})
+        frame = {name: i for i, name in enumerate(names)}
+        events = []
+        for name, t0, t1 in sorted(self.spans, key=lambda s: s[1]):
+            events += [{"type": "O", "frame": frame[name], "at": int(t0 - t_ref)},
+                       {"type": "C", "frame": frame[name], "at": int(t1 - t_ref)}]
+        for row in self.marks[:min(self.n, max_steps)]:
+            events.append({"type": "O", "frame": 0, "at": int(row[0] - t_ref)})
+            for i in range(len(self.phases)):
+                events += [{"type": "O", "frame": i + 1, "at": int(row[i] - t_ref)},
+                           {"type": "C", "frame": i + 1, "at": int(row[i + 1] - t_ref)}]
+            events.append({"type": "C", "frame": 0, "at": int(row[-1] - t_ref)})
+        end = max([e["at"] for e in events], default=0)
+
+        Path(path).write_text(json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": n} for n in names]},
+            "profiles": [{"type": "evented", "name": "model", "unit": "nanoseconds",
+                          "startValue": 0, "endValue": end, "events": events}],
+            "exporter": "Profiling.py",
+        }))
+        return path
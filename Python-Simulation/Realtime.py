@@ -0,0 +1,247 @@
+# ================================================== #
+#    Real-time / hardware-in-the-loop pacing
+# -------------------------------------------------- #
+#  Steps the model on a wall-clock schedule (speed=1
+#  is real time, 2 twice as fast, None free-running)
+#  and, with a UdpLink, exchanges motor commands and
+#  the state with an external flight stack (SITL).
+#  Each step's compute time and wake-up lateness are
+#  recorded by a DeadlineMonitor.
+# -------------------------------------------------- #
+#  Packets (little-endian):
+#    command  <I4d   seq, omega_1..omega_4 [rad/s]
+#    state    <Id12d step, t, x..r (Integrators layout)
+# ================================================== #
+import socket
+import struct
+import time
+import numpy as np
+
+import X_Quad as XQ
+from Data_Logger import CHANNELS, CONSTANTS, Logger, n_steps_for
+from Motor_Inputs import OPEN_LOOP
+from Profiling import clock
+
+CMD = struct.Struct("<I4d")
+STATE = struct.Struct("<Id12d")
+
+
+
+# ================================================== #
+#    UDP link to the flight stack
+# -------------------------------------------------- #
+#  Non-blocking; poll() drains the socket and returns
+#  the newest command (or None). Out-of-order and
+#  malformed packets are counted and ignored.
+# ================================================== #
+class UdpLink:
+    def __init__(self, bind=("127.0.0.1", 9002), peer=("127.0.0.1", 9003)):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(bind)
+        self.sock.setblocking(False)
+        self.peer = peer
+        self.seq = -1
+        self.received = self.stale = self.malformed = 0
+
+    def _unpack(self, data):
+        if len(data) != CMD.size:
+            self.malformed += 1
+            return None
+        seq, *omega = CMD.unpack(data)
+        if seq <= self.seq:
+            self.stale += 1
+            return None
+        self.seq = seq
+        self.received += 1
+        return omega
+
+    def poll(self, timeout=None):
+        # timeout: block up to this long [s] for the first packet (lockstep)
+        cmd = None
+        if timeout is not None:
+            self.sock.settimeout(timeout)
+            try:
+                cmd = self._unpack(self.sock.recv(64))
+            except socket.timeout:
+                pass
+            finally:
+                self.sock.setblocking(False)
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except BlockingIOError:
+                return cmd
+            cmd = self._unpack(data) or cmd
+
+    def send(self, k, t, state):
+        self.sock.sendto(STATE.pack(k, t, *state[:12]), self.peer)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+# ================================================== #
+#    Deadline / jitter statistics
+# -------------------------------------------------- #
+#  compute:  step work after the command is in
+#            (propagate, send)
+#  lateness: wake-up time minus the step's deadline
+#  A miss is a step whose work ends after its deadline.
+# ================================================== #
+class DeadlineMonitor:
+    def __init__(self, n_steps, period_ns):
+        self.period_ns = period_ns
+        self.compute = np.zeros(n_steps, dtype=np.int64)
+        self.lateness = np.zeros(n_steps, dtype=np.int64)
+        self.n = 0
+        self.misses = 0
+        self.resyncs = 0
+
+    def record(self, compute_ns, lateness_ns, missed):
+        self.compute[self.n] = compute_ns
+        self.lateness[self.n] = lateness_ns
+        self.misses += missed
+        self.n += 1
+
+    def report(self):
+        c = self.compute[:self.n] / 1e3
+        j = self.lateness[:self.n] / 1e3
+        if not self.n:
+            return {"steps": 0}
+        return {
+            "steps": self.n,
+            "period_us": self.period_ns / 1e3,
+            "compute_mean_us": float(c.mean()),
+            "compute_p99_us": float(np.percentile(c, 99)),
+            "compute_max_us": float(c.max()),
+            "jitter_mean_us": float(j.mean()),
+            "jitter_p99_us": float(np.percentile(j, 99)),
+            "jitter_max_us": float(j.max()),
+            "misses": self.misses,
+            "miss_rate": self.misses / self.n,
+            "resyncs": self.resyncs,
+        }
+
+    def print_report(self):
+        rep = self.report()
+        if not rep["steps"]:
+            print("0 steps")
+            return
+        print(f"{rep['steps']} steps @ {rep['period_us']:.0f} us: "
+              f"compute mean {rep['compute_mean_us']:.1f} / p99 {rep['compute_p99_us']:.1f} / "
+              f"max {rep['compute_max_us']:.1f} us, "
+              f"jitter mean {rep['jitter_mean_us']:.1f} / p99 {rep['jitter_p99_us']:.1f} / "
+              f"max {rep['jitter_max_us']:.1f} us, "
+              f"{rep['misses']} misses ({rep['miss_rate']:.2%}), {rep['resyncs']} resyncs")
+
+
+
+# ================================================== #
+#    Hybrid sleep: OS sleep, then spin the last spin_ns
+# ================================================== #
+def sleep_until(deadline_ns, spin_ns=200_000):
+    remaining = deadline_ns - clock()
+    if remaining > spin_ns:
+        time.sleep((remaining - spin_ns) / 1e9)
+    while clock() < deadline_ns:
+        pass
+
+
+
+# ================================================== #
+#    Paced simulation
+# -------------------------------------------------- #
+#  speed:    wall-clock multiple (None: free-running)
+#  link:     UdpLink; commands from the link replace
+#            the schedule once the first one arrives
+#  lockstep: wait up to timeout [s] for a command
+#            every step (SITL drives the clock)
+#  resync:   re-anchor the schedule after falling this
+#            many periods behind, instead of bursting
+# ================================================== #
+class RealtimeSim:
+    def __init__(self, params=None, schedule=OPEN_LOOP, channels=None, speed=1.0,
+                 link=None, lockstep=False, timeout=0.1, resync=10, spin_ns=200_000):
+        self.par = {**XQ.default_params(), **(params or {})}
+        self.schedule = schedule
+        self.channels = channels
+        self.speed = speed
+        self.link = link
+        self.lockstep = lockstep
+        self.timeout = timeout
+        self.resync = resync
+        self.spin_ns = spin_ns
+
+        self.n_steps = n_steps_for(self.par["t_tot"], self.par["dt"])
+        period = self.par["dt"] / speed if speed else 0.0
+        self.monitor = DeadlineMonitor(self.n_steps, int(round(period * 1e9)))
+
+    def run(self):
+        from Jit_Loop import propagate
+        par, dt, g = self.par, self.par["dt"], XQ.g
+        l_x, l_y = XQ.effective_arms(par["l"], par["angle_motor1_2"])
+        omega_h = np.sqrt((par["m"] * g) / (4 * par["c_T"]))
+        args = (dt, g, par["m"], par["I_x"], par["I_y"], par["I_z"],
+                l_x, l_y, par["c_T"], par["c_RD"])
+
+        t_vec = np.arange(self.n_steps) * dt
+        U = self.schedule.commands(t_vec, omega_h)
+        out = np.empty((self.n_steps, len(CHANNELS)))
+        state = np.zeros(15)
+        u = np.empty((1, 4))
+        held = None
+
+        link, mon = self.link, self.monitor
+        period = mon.period_ns
+        timeout = self.timeout if self.lockstep else None
+
+        # Compile / load the Numba cache outside the paced loop
+        u[0] = U[0]
+        propagate(t_vec[:1], u, *args, np.zeros(15), np.empty((1, len(CHANNELS))))
+
+        deadline = clock()
+        try:
+            for k in range(self.n_steps):
+                deadline += period
+
+                if link is not None:
+                    cmd = link.poll(timeout)
+                    if cmd is not None:
+                        held = cmd
+                c0 = clock()
+                u[0] = U[k] if held is None else held
+
+                propagate(t_vec[k:k + 1], u, *args, state, out[k:k + 1])
+                if link is not None:
+                    link.send(k, t_vec[k] + dt, state)
+                c1 = clock()
+
+                # ================================================= #
+                #    Pace to the wall clock
+                # ================================================= #
+                missed = period > 0 and c1 > deadline
+                if not period:
+                    lateness = 0
+                elif missed:
+                    lateness = c1 - deadline
+                    if lateness > self.resync * period:
+                        deadline = c1
+                        mon.resyncs += 1
+                else:
+                    sleep_until(deadline, self.spin_ns)
+                    lateness = clock() - deadline
+                mon.record(c1 - c0, lateness, missed)
+        except KeyboardInterrupt:
+            pass                                         # keep the steps done so far
+
+        n = mon.n
+        logs = Logger(n, self.channels, meta={c: par[c] for c in CONSTANTS})
+        logs.record_block(out[:n])
+        return logs
@@ -0,0 +1,138 @@
+# ================================================== #
+#    Content-addressed result cache
+# -------------------------------------------------- #
+#  Key = hash of the physical parameters, integrator
+#  settings and the motor schedule. Entries are .npy
+#  results (Result_Store), so a hit is a memory map.
+#  Least recently used entries are evicted once the
+#  cache exceeds max_bytes / max_entries.
+#  Entries are written under .tmp/ and moved in with
+#  os.replace (sidecar first), so readers never see a
+#  half-written entry; one that fails to load is a miss.
+#  put() never evicts the entry it has just written.
+#  Default location: $XQUAD_CACHE, else the user cache
+#  directory (~/.cache/xquad, %LOCALAPPDATA%\xquad).
+# ================================================== #
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+from pathlib import Path
+
+import X_Quad as XQ
+from Motor_Inputs import OPEN_LOOP
+from Result_Store import load_results, save_results
+
+
+
+def default_root():
+    if os.environ.get("XQUAD_CACHE"):
+        return Path(os.environ["XQUAD_CACHE"])
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]) / "xquad"
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "xquad"
+
+
+CACHE_VERSION = 1                                        # Bump when model() output changes
+
+# model() keywords that change the result (backend does not)
+KEY_KWARGS = {
+    "channels": None, "method": "semi_implicit", "h": None,
+    "rtol": 1e-6, "atol": 1e-9, "attitude": "euler",
+}
+
+
+
+def schedule_digest(schedule):
+    h = hashlib.sha256(np.ascontiguousarray(schedule.offsets, dtype=np.float64).tobytes())
+    h.update(repr((schedule.seg_dt, schedule.t0)).encode())
+    return h.hexdigest()
+
+
+def cache_key(params=None, schedule=OPEN_LOOP, **model_kwargs):
+    unknown = set(model_kwargs) - set(KEY_KWARGS) - {"backend"}
+    if unknown:
+        raise ValueError(f"Cannot cache model() keyword(s): {sorted(unknown)}")
+
+    payload = {
+        "version": CACHE_VERSION,
+        "params": {k: float(v) for k, v in {**XQ.default_params(), **(params or {})}.items()},
+        "g": XQ.g,
+        "ctrl": bool(XQ.Ctrl),
+        "schedule": schedule_digest(schedule),
+        "model": {k: model_kwargs.get(k, v) for k, v in KEY_KWARGS.items()},
+    }
+    text = json.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+
+class ResultCache:
+    def __init__(self, root=None, max_bytes=2 * 1024**3, max_entries=None):
+        self.root = Path(root) if root is not None else default_root()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.root / f"{key}.npy"
+
+    # ================================================== #
+    #    Lookup / store
+    # ================================================== #
+    def get(self, key):
+        path = self._path(key)
+        try:
+            os.utime(path)                               # LRU: mark as recently used
+            return load_results(path)
+        except (OSError, ValueError, KeyError):
+            return None                                  # missing or broken entry
+
+    def put(self, key, results):
+        path = self._path(key)
+        tmp = save_results(results, self.root / ".tmp" / f"{uuid.uuid4().hex}.npy")
+        os.replace(str(tmp) + ".json", str(path) + ".json")
+        os.replace(tmp, path)
+        self.evict(keep=path)
+        return path
+
+    def run(self, params=None, schedule=OPEN_LOOP, **model_kwargs):
+        key = cache_key(params, schedule, **model_kwargs)
+        df = self.get(key)
+        if df is None:
+            logs = XQ.model(params=params, schedule=schedule, **model_kwargs)
+            self.put(key, logs)
+            df = self.get(key)
+            if df is None:                               # removed by another process
+                df = logs.to_frame()
+                df.attrs["meta"] = dict(logs.meta)
+        return df
+
+    # ================================================== #
+    #    Eviction (oldest access first)
+    # ================================================== #
+    def entries(self):
+        out = []
+        for path in self.root.glob("*.npy"):
+            sidecar = Path(str(path) + ".json")
+            size = path.stat().st_size + (sidecar.stat().st_size if sidecar.exists() else 0)
+            out.append((path.stat().st_mtime, size, path, sidecar))
+        return sorted(out, key=lambda e: e[0])
+
+    def evict(self, keep=None):
+        entries = [e for e in self.entries() if e[2] != keep]
+        total = sum(e[1] for e in entries)
+        while entries and (total > self.max_bytes or
+                           (self.max_entries is not None and len(entries) > self.max_entries)):
+            _, size, path, sidecar = entries.pop(0)
+            path.unlink(missing_ok=True)
+            sidecar.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path, sidecar in self.entries():
+            path.unlink(missing_ok=True)
+            sidecar.unlink(missing_ok=True)
+        shutil.rmtree(self.root / ".tmp", ignore_errors=True)  # left by killed writers
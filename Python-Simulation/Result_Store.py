@@ -0,0 +1,199 @@
+# ================================================== #
+#    Result store (binary columnar output)
+# ================================================== #
+import json
+import numpy as np
+from pathlib import Path
+
+# ================================================== #
+#    Backends
+# -------------------------------------------------- #
+#  name -> (suffixes, writer, reader)
+#    writer(path, data, columns, meta)
+#    reader(path) -> DataFrame (meta in df.attrs)
+#  Excel is kept as an opt-in export only.
+#  pandas (and pyarrow / openpyxl through it) is
+#  imported only by the backends that need it.
+# ================================================== #
+BACKENDS = {}
+
+
+def register_backend(name, suffixes, writer, reader):
+    BACKENDS[name] = (tuple(suffixes), writer, reader)
+
+
+def _backend_for(path, fmt):
+    if fmt is not None:
+        if fmt not in BACKENDS:
+            raise ValueError(f"Unknown result format '{fmt}' (have {sorted(BACKENDS)})")
+        return BACKENDS[fmt]
+    suffix = Path(path).suffix.lower()
+    for backend in BACKENDS.values():
+        if suffix in backend[0]:
+            return backend
+    raise ValueError(f"Cannot infer result format from '{suffix}' (have {sorted(BACKENDS)})")
+
+
+def _frame(data, columns, meta):
+    import pandas as pd
+    df = pd.DataFrame(data, columns=list(columns), copy=False)
+    df.attrs["meta"] = dict(meta)
+    return df
+
+
+def _sidecar(path):
+    return Path(str(path) + ".json")
+
+
+
+# ================================================== #
+#    Parquet / Feather (Arrow IPC) -- need pyarrow
+# ================================================== #
+def _write_parquet(path, data, columns, meta):
+    _frame(data, columns, meta).to_parquet(path, index=False)
+
+def _read_parquet(path):
+    import pandas as pd
+    return pd.read_parquet(path)
+
+def _write_feather(path, data, columns, meta):
+    _frame(data, columns, meta).to_feather(path)
+    _sidecar(path).write_text(json.dumps({"columns": list(columns), "meta": meta}))
+
+def _read_feather(path):
+    import pandas as pd
+    df = pd.read_feather(path)
+    if _sidecar(path).exists():
+        df.attrs["meta"] = json.loads(_sidecar(path).read_text())["meta"]
+    return df
+
+
+
+# ================================================== #
+#    Compressed NPZ
+# ================================================== #
+def _write_npz(path, data, columns, meta):
+    np.savez_compressed(path, data=data, columns=np.array(columns),
+                        meta=np.array(json.dumps(meta)))
+
+def _read_npz(path):
+    with np.load(path) as f:
+        return _frame(f["data"], f["columns"].tolist(), json.loads(f["meta"].item()))
+
+
+
+# ================================================== #
+#    Memory-mapped .npy (+ .npy.json sidecar)
+# ================================================== #
+def _write_npy(path, data, columns, meta):
+    np.save(path, np.ascontiguousarray(data, dtype=np.float64))
+    _sidecar(path).write_text(json.dumps({"columns": list(columns), "meta": meta}))
+
+def _read_npy(path):
+    info = json.loads(_sidecar(path).read_text())
+    return _frame(np.load(path, mmap_mode="r"), info["columns"], info["meta"])
+
+
+
+# ================================================== #
+#    Append-only raw float64 (+ .f64.json sidecar)
+# -------------------------------------------------- #
+#  Rows are appended block by block while a run is in
+#  progress (AppendStore); readers memory-map the file.
+# ================================================== #
+class AppendStore:
+    def __init__(self, path, columns, meta=None):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.meta = {k: float(v) for k, v in (meta or {}).items()}
+        self.rows = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "wb")
+        self._write_sidecar()
+
+    def _write_sidecar(self):
+        _sidecar(self.path).write_text(json.dumps(
+            {"columns": self.columns, "meta": self.meta, "rows": self.rows}))
+
+    def append(self, block):
+        block = np.ascontiguousarray(block, dtype=np.float64)
+        if block.ndim != 2 or block.shape[1] != len(self.columns):
+            raise ValueError(f"Expected (k, {len(self.columns)}) block, got {block.shape}")
+        self._f.write(block.tobytes())
+        self._f.flush()
+        self.rows += len(block)
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+            self._write_sidecar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _write_f64(path, data, columns, meta):
+    with AppendStore(path, columns, meta) as store:
+        store.append(data)
+
+def _read_f64(path):
+    info = json.loads(_sidecar(path).read_text())
+    n_cols = len(info["columns"])
+    # Size from the file itself, so a run still in progress can be read
+    n_rows = Path(path).stat().st_size // (8 * n_cols)
+    if n_rows == 0:
+        return _frame(np.empty((0, n_cols)), info["columns"], info["meta"])
+    data = np.memmap(path, dtype=np.float64, mode="r", shape=(n_rows, n_cols))
+    return _frame(data, info["columns"], info["meta"])
+
+
+
+# ================================================== #
+#    Excel (opt-in export, old layout with constants)
+# ================================================== #
+def _write_xlsx(path, data, columns, meta):
+    _frame(data, columns, meta).assign(**meta).to_excel(path, index=False)
+
+def _read_xlsx(path):
+    import pandas as pd
+    return pd.read_excel(path)
+
+
+
+register_backend("parquet", [".parquet", ".pq"], _write_parquet, _read_parquet)
+register_backend("feather", [".feather", ".arrow"], _write_feather, _read_feather)
+register_backend("npz", [".npz"], _write_npz, _read_npz)
+register_backend("npy", [".npy"], _write_npy, _read_npy)
+register_backend("f64", [".f64"], _write_f64, _read_f64)
+register_backend("xlsx", [".xlsx"], _write_xlsx, _read_xlsx)
+
+
+
+# ================================================== #
+#    Save / load
+# -------------------------------------------------- #
+#  results: Logger or DataFrame
+#  fmt: backend name, inferred from the suffix if None
+# ================================================== #
+def save_results(results, path, fmt=None):
+    path = Path(path)
+    _, writer, _ = _backend_for(path, fmt)
+
+    if hasattr(results, "to_numpy"):                   # DataFrame
+        data = results.to_numpy(dtype=np.float64)
+        columns = list(results.columns)
+        meta = results.attrs.get("meta", {})
+    else:
+        data, columns, meta = results.values, results.channels, results.meta
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer(path, data, columns, {k: float(v) for k, v in meta.items()})
+    return path
+
+
+def load_results(path, fmt=None):
+    _, _, reader = _backend_for(path, fmt)
+    return reader(Path(path))
@@ -0,0 +1,156 @@
+# ================================================== #
+#    Motor dynamics and rotor thrust/torque maps
+# -------------------------------------------------- #
+#  RotorModel(tau, table):
+#    tau   first-order motor lag [s]; 0 = instant
+#    table RotorTable from test-stand data; None =
+#          c_T*omega^2 / c_RD*omega^2
+#  Pass it as X_Quad.model(rotor=...) or
+#  Batch_Sim.batch_model(rotor=...).
+# -------------------------------------------------- #
+#  The lag is discretized exactly for the held input:
+#    omega_k = omega_{k-1} + a (u_k - omega_{k-1}),
+#    a = 1 - exp(-dt / tau)
+#  Motors start at the first command (spun up).
+# ================================================== #
+import math
+import numpy as np
+from pathlib import Path
+
+from Integrators import forces_moments
+
+RPM2RADS = 2 * np.pi / 60
+
+
+
+# ================================================== #
+#    Lag over a whole command sequence (compiled)
+# -------------------------------------------------- #
+#  Compiled on first use, so importing this module
+#  does not load Numba.
+# ================================================== #
+def _lag_filter(U, a, out):
+    # U, out: (n_steps, n_motors)
+    out[0] = U[0]
+    for k in range(1, U.shape[0]):
+        for j in range(U.shape[1]):
+            out[k, j] = out[k - 1, j] + a * (U[k, j] - out[k - 1, j])
+    return out
+
+
+_compiled = None
+
+
+def lag_filter(U, a, out):
+    global _compiled
+    if _compiled is None:
+        from Jit_Loop import njit
+        _compiled = njit(cache=True)(_lag_filter)
+    return _compiled(U, a, out)
+
+
+
+# ================================================== #
+#    Thrust / torque lookup table
+# -------------------------------------------------- #
+#  Test-stand points are resampled once onto a
+#  uniform omega grid, so a lookup is an index
+#  computation plus one linear blend (any array
+#  shape, no search). Outside the measured range
+#  the end segments are extrapolated linearly.
+# ================================================== #
+class RotorTable:
+    def __init__(self, omega, thrust, torque, n_grid=1024):
+        omega = np.asarray(omega, dtype=float)
+        order = np.argsort(omega)
+        omega, thrust, torque = omega[order], np.asarray(thrust, float)[order], np.asarray(torque, float)[order]
+        if len(omega) < 2:
+            raise ValueError("A rotor table needs at least two points")
+
+        self.omega = np.linspace(omega[0], omega[-1], n_grid)
+        self.thrust = np.interp(self.omega, omega, thrust)
+        self.torque = np.interp(self.omega, omega, torque)
+        self._dT = np.diff(self.thrust)
+        self._dQ = np.diff(self.torque)
+        self._w0 = self.omega[0]
+        self._inv_h = (n_grid - 1) / (omega[-1] - omega[0])
+        self._last = n_grid - 2
+
+    @classmethod
+    def from_coefficients(cls, c_T, c_RD, omega_max=1500.0, n_grid=1024):
+        omega = np.linspace(0.0, omega_max, n_grid)
+        return cls(omega, c_T * omega**2, c_RD * omega**2, n_grid)
+
+    @classmethod
+    def from_csv(cls, path, n_grid=1024):
+        # Columns: omega [rad/s] (or a header naming it rpm),
+        #          thrust [N], torque [N*m]
+        rows, rpm = [], False
+        for line in Path(path).read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                rows.append([float(v) for v in line.split(",")[:3]])
+            except ValueError:
+                if rows:
+                    raise
+                rpm = line.split(",")[0].strip().lower() == "rpm"
+                continue                                     # header
+        omega, thrust, torque = np.array(rows).T
+        return cls(omega * RPM2RADS if rpm else omega, thrust, torque, n_grid)
+
+    def lookup(self, omega):
+        x = (np.asarray(omega, dtype=float) - self._w0) * self._inv_h
+        i = np.clip(x.astype(np.intp), 0, self._last)
+        f = x - i
+        return self.thrust[i] + f * self._dT[i], self.torque[i] + f * self._dQ[i]
+
+    def hover_speed(self, thrust):
+        # Per-motor speed for a per-motor thrust (monotone table)
+        return float(np.interp(thrust, self.thrust, self.omega))
+
+
+
+# ================================================== #
+#    Rotor model
+# ================================================== #
+class RotorModel:
+    def __init__(self, tau=0.0, table=None):
+        if tau < 0:
+            raise ValueError("tau must be >= 0")
+        self.tau = float(tau)
+        self.table = table
+
+    def gain(self, dt):
+        return 1.0 - math.exp(-dt / self.tau) if self.tau > 0 else 1.0
+
+    def motor_speeds(self, U, dt):
+        # U: commands (n_steps, ...) -> actual speeds, same shape
+        if self.tau == 0:
+            return U
+        U = np.ascontiguousarray(U, dtype=float)
+        flat = U.reshape(len(U), -1)
+        return lag_filter(flat, self.gain(dt), np.empty_like(flat)).reshape(U.shape)
+
+    def step(self, omega, u, a):
+        # One lag step for a batch: omega, u (4, N)
+        return omega + a * (u - omega)
+
+    def forces_moments(self, omega, P):
+        # omega (4, ...) -> F_T, M_x, M_y, M_z
+        if self.table is None:
+            return forces_moments(omega, P)
+        T, Q = self.table.lookup(omega)
+        F_T = T[0] + T[1] + T[2] + T[3]
+        M_x = P["l_y"] * (-T[0] + T[1] + T[2] - T[3])
+        M_y = P["l_x"] * (-T[0] - T[1] + T[2] + T[3])
+        M_z = Q[0] - Q[1] + Q[2] - Q[3]
+        return F_T, M_x, M_y, M_z
+
+    def hover_speed(self, m, g, c_T):
+        if self.table is None:
+            return np.sqrt((m * g) / (4 * c_T))
+        if np.ndim(m):
+            return np.interp(np.asarray(m) * g / 4, self.table.thrust, self.table.omega)
+        return self.table.hover_speed(m * g / 4)
@@ -0,0 +1,87 @@
+# ================================================== #
+#    Streaming simulation (fixed-size blocks)
+# -------------------------------------------------- #
+#  Propagates the model block by block (Jit_Loop, with
+#  the state carried between blocks) and yields each
+#  block of logged rows while the run is in progress.
+#  Only one block is held in memory, whatever t_tot.
+# ================================================== #
+import numpy as np
+
+import X_Quad as XQ
+from Data_Logger import CHANNELS, CONSTANTS, n_steps_for
+from Motor_Inputs import OPEN_LOOP
+from Result_Store import AppendStore
+
+
+
+class StreamSim:
+    # ================================================== #
+    #  block_rows: logged rows per yielded block
+    #  decimate:   log every k-th step only
+    # ================================================== #
+    def __init__(self, params=None, schedule=OPEN_LOOP, channels=None,
+                 decimate=1, block_rows=4096):
+        par = {**XQ.default_params(), **(params or {})}
+        channels = list(CHANNELS if channels is None else channels)
+        unknown = [c for c in channels if c not in CHANNELS]
+        if unknown:
+            raise KeyError(f"Unknown channel(s): {unknown}")
+        if decimate < 1 or block_rows < 1:
+            raise ValueError("decimate and block_rows must be >= 1")
+
+        self.par = par
+        self.schedule = schedule
+        self.channels = channels
+        self.decimate = int(decimate)
+        self.block_rows = int(block_rows)
+        self.meta = {k: par[k] for k in CONSTANTS}
+
+        self.n_steps = n_steps_for(par["t_tot"], par["dt"])
+        self.n_rows = -(-self.n_steps // self.decimate)
+        self._idx = np.array([CHANNELS.index(c) for c in channels], dtype=np.intp)
+
+    # ================================================== #
+    #    Generator of (k, n_channels) blocks
+    # ================================================== #
+    def blocks(self):
+        par, dt = self.par, self.par["dt"]
+        l_x, l_y = XQ.effective_arms(par["l"], par["angle_motor1_2"])
+        omega_h = np.sqrt((par["m"] * XQ.g) / (4 * par["c_T"]))
+
+        from Jit_Loop import run as jit_run                # Numba loads on first block
+        steps = self.block_rows * self.decimate
+        buf = np.empty((steps, len(CHANNELS)))
+        state = np.zeros(15)
+
+        for k0 in range(0, self.n_steps, steps):
+            k1 = min(k0 + steps, self.n_steps)
+            t = np.arange(k0, k1) * dt
+            U = self.schedule.commands(t, omega_h)
+            out = jit_run(t, U, dt, XQ.g, par["m"], par["I_x"], par["I_y"], par["I_z"],
+                          l_x, l_y, par["c_T"], par["c_RD"], state=state, out=buf[:k1 - k0])
+            # k0 is a multiple of decimate, so [::decimate] keeps global steps
+            yield out[::self.decimate][:, self._idx]
+
+    __iter__ = blocks
+
+    # ================================================== #
+    #    Drive the stream into a store and/or callback
+    # -------------------------------------------------- #
+    #  path:     append-only .f64 file (Result_Store)
+    #  callback: callback(block) for every block
+    # ================================================== #
+    def run(self, path=None, callback=None):
+        store = AppendStore(path, self.channels, self.meta) if path is not None else None
+        rows = 0
+        try:
+            for block in self.blocks():
+                if store is not None:
+                    store.append(block)
+                if callback is not None:
+                    callback(block)
+                rows += len(block)
+        finally:
+            if store is not None:
+                store.close()
+        return rows
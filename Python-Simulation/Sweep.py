@@ -0,0 +1,299 @@
+# ================================================== #
+#    Parallel parameter sweeps / Monte Carlo
+# ================================================== #
+import itertools
+import json
+import os
+import tempfile
+import uuid
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import X_Quad as XQ
+from Data_Logger import CHANNELS, n_steps_for
+from Ensemble_Stats import EnsembleStats
+
+SUMMARY_KEYS = ["x", "y", "z", "phi", "theta", "psi"]
+
+
+
+# ================================================== #
+#    Run lists
+# -------------------------------------------------- #
+#  Each run is a dict of X_Quad.PARAM_KEYS overrides.
+#  Keep the run list deterministic (grid, or sample
+#  with a seed) so a checkpoint can be resumed.
+# ================================================== #
+def _scalar(value):
+    # numpy scalars -> Python, so run dicts stay JSON-serializable
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def grid(**axes):
+    keys = list(axes)
+    return [dict(zip(keys, map(_scalar, values))) for values in itertools.product(*axes.values())]
+
+
+def sample(n, seed=None, **dists):
+    # dist: (low, high) -> uniform, list -> choice,
+    #       callable(rng) -> drawn value
+    rng = np.random.default_rng(seed)
+    runs = []
+    for _ in range(n):
+        run = {}
+        for key, dist in dists.items():
+            if callable(dist):
+                run[key] = float(dist(rng))
+            elif isinstance(dist, tuple):
+                run[key] = float(rng.uniform(*dist))
+            else:
+                run[key] = _scalar(dist[rng.integers(len(dist))])
+        runs.append(run)
+    return runs
+
+
+
+# ================================================== #
+#    Per-run summary (kept small, streamed back)
+# ================================================== #
+def summarize(logs):
+    out = {}
+    for key in SUMMARY_KEYS:
+        col = logs[key]
+        out[f"{key}_final"] = float(col[-1])
+        out[f"{key}_max_abs"] = float(np.max(np.abs(col)))
+    out["diverged"] = not bool(np.isfinite(logs.values).all())   # logged channels only
+    return out
+
+
+def _run_one(index, params, model_kwargs, summary, spec=None):
+    if spec is None:
+        logs = XQ.model(params=params, **model_kwargs)
+        return {"run": index, "params": params, "summary": summary(logs)}
+
+    results = SharedResults.attach(spec)
+    logs = XQ.model(params=params, **model_kwargs)
+    rows = len(logs)
+    block = results.array[index, :rows]                  # the run's slot in the shared block
+    for j, channel in enumerate(results.channels):
+        block[:, j] = logs[channel]
+    return {"run": index, "params": params, "summary": summary(logs), "rows": rows}
+
+
+
+# ================================================== #
+#    Shared result block (runs x steps x channels)
+# -------------------------------------------------- #
+#  One float64 array in a memory-mapped file, by
+#  default in /dev/shm (RAM-backed, deleted on
+#  close()). Workers attach by path and write their
+#  run's rows in place; the parent reads zero-copy
+#  views, so nothing but the summary is pickled.
+#  Pass path= to keep the block (plus a .json
+#  sidecar) on disk; SharedResults.open(path)
+#  reattaches, e.g. to resume a checkpointed sweep.
+#  Rows past a run's length are NaN.
+# ================================================== #
+_attached = {}                                           # Per-process views, by path
+
+
+class SharedResults:
+    def __init__(self, n_runs, n_steps, channels=None, path=None):
+        self.channels = list(CHANNELS if channels is None else channels)
+        unknown = [c for c in self.channels if c not in CHANNELS]
+        if unknown:
+            raise KeyError(f"Unknown channel(s): {unknown}")
+        self.shape = (n_runs, n_steps, len(self.channels))
+        self.temporary = path is None
+        if path is None:
+            root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            path = Path(root) / f"xquad_sweep_{uuid.uuid4().hex}.f64"
+        self.path = Path(path)
+
+        self.array = np.memmap(self.path, dtype=np.float64, mode="w+", shape=self.shape)
+        self.array[:] = np.nan
+        self.rows = np.zeros(n_runs, dtype=np.int64)
+        if not self.temporary:
+            self._write_sidecar()
+
+    @classmethod
+    def for_runs(cls, runs, channels=None, path=None):
+        # n_steps: the longest run (t_tot / dt overrides included)
+        par = XQ.default_params()
+        n_steps = max((n_steps_for(run.get("t_tot", par["t_tot"]), run.get("dt", par["dt"]))
+                       for run in runs), default=0)
+        return cls(len(runs), n_steps, channels, path)
+
+    # ================================================== #
+    #    Worker side
+    # ================================================== #
+    @property
+    def spec(self):
+        return (str(self.path), self.shape, self.channels)
+
+    @classmethod
+    def attach(cls, spec):
+        path, shape, channels = spec
+        view = _attached.get(path)
+        if view is None:
+            view = cls.__new__(cls)
+            view.path, view.shape, view.channels = Path(path), tuple(shape), list(channels)
+            view.temporary = False
+            view.array = np.memmap(path, dtype=np.float64, mode="r+", shape=view.shape)
+            view.rows = None
+            _attached[path] = view
+        return view
+
+    # ================================================== #
+    #    Parent side
+    # ================================================== #
+    def _write_sidecar(self):
+        Path(str(self.path) + ".json").write_text(json.dumps(
+            {"shape": self.shape, "channels": self.channels, "rows": self.rows.tolist()}))
+
+    @classmethod
+    def open(cls, path):
+        meta = json.loads(Path(str(path) + ".json").read_text())
+        res = cls.__new__(cls)
+        res.path, res.shape, res.channels = Path(path), tuple(meta["shape"]), meta["channels"]
+        res.temporary = False
+        res.array = np.memmap(path, dtype=np.float64, mode="r+", shape=res.shape)
+        res.rows = np.asarray(meta["rows"], dtype=np.int64)
+        return res
+
+    def __getitem__(self, channel):
+        # (runs, steps) view of one channel
+        return self.array[:, :, self.channels.index(channel)]
+
+    def close(self):
+        if self.array is None:
+            return
+        if not self.temporary:
+            self.array.flush()
+            self._write_sidecar()
+        self.array = None
+        if self.temporary:
+            self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+# ================================================== #
+#    Checkpoint (append-only JSONL, one line per run)
+# ================================================== #
+def load_checkpoint(path):
+    done = {}
+    if path is not None and Path(path).exists():
+        for line in Path(path).read_text().splitlines():
+            if line.strip():
+                record = json.loads(line)
+                done[record["run"]] = record
+    return done
+
+
+
+# ================================================== #
+#    Sweep runner
+# -------------------------------------------------- #
+#  Generator: yields {"run", "params", "summary"} as
+#  runs finish (completion order). Runs already in the
+#  checkpoint are skipped. summary must be picklable
+#  (a module-level function). Extra keyword arguments
+#  go to X_Quad.model() (method, schedule, ...).
+#  Workers log only SUMMARY_KEYS, the results channels
+#  and any channels= passed here, so that is all a
+#  summary sees.
+#  results: a SharedResults the workers write every
+#  run's logged channels into; its rows are restored
+#  from the checkpoint on resume, and its sidecar is
+#  rewritten every sidecar_every runs and at the end.
+# ================================================== #
+def run_sweep(runs, workers=None, checkpoint=None, summary=summarize, results=None,
+              sidecar_every=100, **model_kwargs):
+    workers = workers or os.cpu_count() or 1
+    channels = [*(model_kwargs.get("channels") or []), *SUMMARY_KEYS,
+                *(results.channels if results is not None else [])]
+    model_kwargs = {**model_kwargs, "channels": list(dict.fromkeys(channels))}
+    done = load_checkpoint(checkpoint)
+    todo = [(i, run) for i, run in enumerate(runs) if i not in done]
+    spec = results.spec if results is not None else None
+    if results is not None:
+        for i, record in done.items():                   # resumed: rows already in the block
+            if "rows" in record:
+                results.rows[i] = record["rows"]
+
+    log = open(checkpoint, "a") if checkpoint is not None else None
+    keep_sidecar = results is not None and not results.temporary
+    n_done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            queue = iter(todo)
+            while True:
+                # Keep a bounded number of runs in flight
+                for i, run in itertools.islice(queue, 2 * workers - len(pending)):
+                    pending.add(pool.submit(_run_one, i, run, model_kwargs, summary, spec))
+                if not pending:
+                    break
+
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    if results is not None:
+                        results.rows[record["run"]] = record["rows"]
+                    n_done += 1
+                    if keep_sidecar and n_done % sidecar_every == 0:
+                        results._write_sidecar()         # survives a crash before close()
+                    if log is not None:
+                        log.write(json.dumps(record) + "\n")
+                        log.flush()
+                    yield record
+    finally:
+        if log is not None:
+            log.close()
+        if keep_sidecar and results.array is not None:
+            results._write_sidecar()
+
+
+
+# ================================================== #
+#    Ensemble statistics (no trajectories kept)
+# -------------------------------------------------- #
+#  Each task folds a chunk of runs into its own
+#  EnsembleStats; the parent merges them in chunk
+#  order. Only the reducers are pickled back, so
+#  memory stays O(steps x channels) per process.
+#  All runs must share t_tot / dt.
+# ================================================== #
+def _reduce_chunk(chunk, n_steps, channels, k, seed, model_kwargs):
+    stats = EnsembleStats(n_steps, channels, k, seed)
+    for params in chunk:
+        stats.add(XQ.model(params=params, **model_kwargs))
+    return stats
+
+
+def run_ensemble(runs, workers=None, chunks=None, channels=None, k=128, seed=None,
+                 **model_kwargs):
+    workers = workers or os.cpu_count() or 1
+    par = XQ.default_params()
+    n_steps = {n_steps_for(run.get("t_tot", par["t_tot"]), run.get("dt", par["dt"])) for run in runs}
+    if len(n_steps) > 1:
+        raise ValueError("Ensemble runs must all have the same number of steps (t_tot / dt)")
+    n_steps = n_steps.pop() if n_steps else n_steps_for(par["t_tot"], par["dt"])
+
+    chunks = max(1, min(chunks or workers, len(runs)))
+    parts = [runs[i::chunks] for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+
+    stats = EnsembleStats(n_steps, channels, k, seed)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_reduce_chunk, parts, [n_steps] * chunks, [channels] * chunks,
+                             [k] * chunks, seeds, [model_kwargs] * chunks):
+            stats.merge(part)
+    return stats
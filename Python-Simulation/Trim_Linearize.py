@@ -0,0 +1,210 @@
+# ================================================== #
+#    Trim, linearization and linear surrogates
+# -------------------------------------------------- #
+#  trim():       Newton solve for the attitude, body
+#                rates and motor speeds that hold a
+#                flight condition (velocity, accel,
+#                heading, yaw rate)
+#  jacobians():  A = df/ds (12x12), B = df/domega
+#                (12x4) of Integrators.derivatives by
+#                complex-step differentiation (exact
+#                to machine precision, one vectorized
+#                call for all 16 columns)
+#  Linearizer:   jacobians() cached per operating point
+#  discretize(): zero-order-hold (Ad, Bd) via a numpy
+#                matrix exponential
+#  LinearSurrogate: x_{k+1} = Ad x_k + Bd u_k about
+#                the trim, for one or N input sets
+# ================================================== #
+import numpy as np
+
+import X_Quad as XQ
+from Integrators import derivatives, POS, VEL, ANG, RATE
+
+H_CS = 1e-30                                             # Complex step
+
+
+
+def dynamics_params(params=None):
+    # The P dict model() builds, for X_Quad parameters
+    par = {**XQ.default_params(), **(params or {})}
+    l_x, l_y = XQ.effective_arms(par["l"], par["angle_motor1_2"])
+    return {
+        "m": par["m"], "I_x": par["I_x"], "I_y": par["I_y"], "I_z": par["I_z"],
+        "l_x": l_x, "l_y": l_y, "c_T": par["c_T"], "c_RD": par["c_RD"], "g": XQ.g
+    }
+
+
+
+# ================================================== #
+#    Jacobians (complex step)
+# -------------------------------------------------- #
+#  Column j perturbs input j by i*h; since derivatives()
+#  is analytic in s and omega, Im(f)/h is df/dx_j with
+#  no subtractive cancellation.
+# ================================================== #
+def jacobians(s, omega, P):
+    x0 = np.r_[np.asarray(s, dtype=float), np.asarray(omega, dtype=float)]
+    X = x0[:, None] + 1j * H_CS * np.eye(16)
+    J = derivatives(X[:12], X[12:], P).imag / H_CS
+    return J[:, :12], J[:, 12:]
+
+
+
+# ================================================== #
+#    Trim
+# -------------------------------------------------- #
+#  Unknowns: phi, theta, p, q, r, omega_1..4
+#  Residual: inertial accel - accel, body angular
+#            accel, dphi, dtheta, dpsi - yaw_rate
+#  Position, velocity and psi are set, not solved.
+#  Returns (s_trim (12,), omega_trim (4,)).
+# ================================================== #
+def _trim_residual(z, s, P, target):
+    s = np.broadcast_to(s, (12,) + z.shape[1:]).astype(z.dtype)
+    s[6:8], s[RATE] = z[0:2], z[2:5]
+    f = derivatives(s, z[5:9], P)
+    return np.concatenate([f[VEL], f[RATE], f[ANG]]) - target
+
+
+def trim(P, vel=(0.0, 0.0, 0.0), accel=(0.0, 0.0, 0.0), psi=0.0, yaw_rate=0.0,
+         pos=(0.0, 0.0, 0.0), tol=1e-10, max_iter=50):
+    s = np.zeros(12)
+    s[POS], s[VEL], s[8] = pos, vel, psi
+    target = np.r_[accel, 0.0, 0.0, 0.0, 0.0, 0.0, yaw_rate][:, None]
+
+    omega_h = np.sqrt((P["m"] * P["g"]) / (4 * P["c_T"]))
+    z = np.r_[0.0, 0.0, 0.0, 0.0, yaw_rate, np.full(4, omega_h)]
+
+    for _ in range(max_iter):
+        Z = z[:, None] + 1j * H_CS * np.eye(9)
+        F = _trim_residual(Z, s[:, None], P, target)
+        res, J = F.real[:, 0], F.imag / H_CS
+        if np.max(np.abs(res)) < tol:
+            break
+        z = z - np.linalg.solve(J, res)
+    else:
+        raise RuntimeError(f"Trim did not converge (|residual| = {np.max(np.abs(res)):.3g})")
+
+    s[6:8], s[RATE] = z[0:2], z[2:5]
+    return s, z[5:9]
+
+
+
+# ================================================== #
+#    Per-operating-point cache
+# -------------------------------------------------- #
+#  Key: the operating point rounded to `decimals`;
+#  entries are evicted oldest-first past maxsize.
+# ================================================== #
+class Linearizer:
+    def __init__(self, P, decimals=9, maxsize=4096):
+        self.P = P
+        self.decimals = decimals
+        self.maxsize = maxsize
+        self._cache = {}
+        self.hits = self.misses = 0
+
+    def _key(self, s, omega):
+        return tuple(np.round(np.r_[s, omega], self.decimals).tolist())
+
+    def jacobians(self, s, omega):
+        key = self._key(s, omega)
+        AB = self._cache.get(key)
+        if AB is not None:
+            self.hits += 1
+            return AB
+        self.misses += 1
+        AB = jacobians(s, omega, self.P)
+        if len(self._cache) >= self.maxsize:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = AB
+        return AB
+
+    def at_trim(self, **condition):
+        s, omega = trim(self.P, **condition)
+        A, B = self.jacobians(s, omega)
+        return s, omega, A, B
+
+    def clear(self):
+        self._cache.clear()
+
+
+
+# ================================================== #
+#    Matrix exponential (scaling and squaring, Pade 6)
+# ================================================== #
+PADE6 = [1.0, 1/2, 5/44, 1/66, 1/792, 1/15840, 1/665280]
+
+
+def expm(M):
+    norm = np.linalg.norm(M, 1)
+    n_sq = max(0, int(np.ceil(np.log2(norm / 0.5)))) if norm > 0 else 0
+    X = M / 2.0**n_sq
+
+    I = np.eye(len(M))
+    X_k = I
+    N = PADE6[0] * I
+    D = PADE6[0] * I
+    for k, c in enumerate(PADE6[1:], start=1):
+        X_k = X_k @ X
+        N = N + c * X_k
+        D = D + (-1)**k * c * X_k
+
+    E = np.linalg.solve(D, N)
+    for _ in range(n_sq):
+        E = E @ E
+    return E
+
+
+def discretize(A, B, dt):
+    # ZOH: exp([[A, B], [0, 0]] dt) = [[Ad, Bd], [0, I]]
+    n, m = B.shape
+    M = np.zeros((n + m, n + m))
+    M[:n, :n], M[:n, n:] = A, B
+    E = expm(M * dt)
+    return E[:n, :n], E[:n, n:]
+
+
+
+# ================================================== #
+#    Linear surrogate propagator
+# -------------------------------------------------- #
+#  Deviations about (s_trim, omega_trim), held per dt.
+#  simulate(U) takes motor speeds (n, 4) or (n, 4, N)
+#  and returns states (n, 12) or (n, 12, N); row k is
+#  the state at t_k + dt, as in X_Quad.model().
+# ================================================== #
+class LinearSurrogate:
+    def __init__(self, s_trim, omega_trim, P, dt, A=None, B=None):
+        self.s_trim = np.asarray(s_trim, dtype=float)
+        self.omega_trim = np.asarray(omega_trim, dtype=float)
+        if A is None or B is None:
+            A, B = jacobians(self.s_trim, self.omega_trim, P)
+        self.A, self.B, self.dt = A, B, dt
+
+        # f(trim) is not zero when the trim moves (velocity,
+        # yaw rate); it is carried as a constant input
+        f0 = derivatives(self.s_trim, self.omega_trim, P)
+        self.Ad, Bd = discretize(A, np.column_stack([B, f0]), dt)
+        self.Bd, self.c = Bd[:, :4], Bd[:, 4]
+
+    @classmethod
+    def at_trim(cls, P, dt, **condition):
+        s, omega = trim(P, **condition)
+        return cls(s, omega, P, dt)
+
+    def simulate(self, U, s0=None):
+        U = np.asarray(U, dtype=float)
+        batch = U.shape[2:]
+        du = U - self.omega_trim.reshape((4,) + (1,) * len(batch))
+        x = np.zeros((12,) + batch)
+        if s0 is not None:
+            x = x + (np.asarray(s0, dtype=float).T - self.s_trim.reshape((12,) + (1,) * len(batch)))
+        c = self.c.reshape((12,) + (1,) * len(batch))
+
+        S = np.empty((len(U), 12) + batch)
+        for k in range(len(U)):
+            x = self.Ad @ x + self.Bd @ du[k] + c
+            S[k] = x
+        return S + self.s_trim.reshape((12,) + (1,) * len(batch))
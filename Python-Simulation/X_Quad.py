@@ -1,12 +1,23 @@
 # ================================================== #
 #    Written by Brennan Larsen
 # ================================================== #
+import argparse
+import importlib.util
+import sys
+import warnings
 import numpy as np
-import pandas as pd
 from pathlib import Path
 
-from Motor_Inputs import open_loop_motor_inputs
-from Dyn_Plots import plot_states
+from Motor_Inputs import OPEN_LOOP
+from Integrators import (integrate, derivatives, derivatives_quat,
+                         POS, VEL, QUAT, QRATE, METHODS, ATTITUDES)
+from Kinematics import RotationKernel, quat2euler, quat_normalize
+from Controller import CascadedPID, closed_loop
+from Data_Logger import CORE, Logger
+from Post_Process import derive, derive_states
+from Profiling import clock
+
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None   # Jit_Loop imported on use
 
 # ================================================== #
 #    Assumptions
@@ -22,7 +33,9 @@ from Dyn_Plots import plot_states
 # ================================================== #
 #    Paths
 # ================================================== #
-data_path = Path(__file__).parent / "Data" / "Data1.xlsx"
+data_path = Path("Data") / "Data1.npz"                      # Under the working directory; .parquet / .feather / .npy also work
+export_excel = False                                        # Opt-in Data1.xlsx export (slow)
+use_cache = True                                            # Reuse cached results for unchanged inputs (Result_Cache.default_root())
 
 
 
@@ -38,9 +51,10 @@ deg2rad = np.pi/180
 
 
 # ================================================== #
-# Control loop not currently implemented
+# Control loop (see Controller.py)
 # -------------------------------------------------- #
-# If Ctrl = True  --> Att controlled
+# If Ctrl = True  --> Att controlled (CascadedPID
+#                     unless model(controller=...))
 # If Ctrl = False --> Open loop
 # ================================================== #
 Ctrl = False 
@@ -63,140 +77,288 @@ angle_motor1_2 = 90                                  # Angle between front motor
 c_T = 2.98e-06                                       # Thrust coefficient [(N*s^2)/(rad^2)]
 c_RD = 1.14e-07                                      # Rotor drag coefficient [(N*m*s^2)/(rad^2)]
 
+PARAM_KEYS = ["m", "I_x", "I_y", "I_z", "l", "angle_motor1_2", "c_T", "c_RD", "t_tot", "dt"]
+
+def effective_arms(l, angle_motor1_2):
+    arm_ang_23  = 180 - angle_motor1_2                   # [deg]
+    l_x = l * np.sin(deg2rad * (arm_ang_23 / 2))         # [m]
+    l_y = l * np.sin(deg2rad * (angle_motor1_2 / 2))     # [m]
+    return l_x, l_y
+
+def default_params():
+    # Module values above; model(params=...) overrides any of them
+    g_ = globals()
+    return {key: g_[key] for key in PARAM_KEYS}
+
 
 
 # ================================================== #
 #    Rotation Matrices  
+# -------------------------------------------------- #
+#  Thin wrappers over Kinematics.RotationKernel; the
+#  model loop calls the kernel directly (sin/cos once
+#  per step).
 # ================================================== #
+_rot = RotationKernel()
+
 def Inertial2Body(phi, theta, psi, x, y, z):
-    R_1 = np.array([[             1,            0,             0],
-                    [             0,  np.cos(phi),  -np.sin(phi)],
-                    [             0,  np.sin(phi),   np.cos(phi)]])
-    R_2 = np.array([[ np.cos(theta),            0, np.sin(theta)],
-                    [             0,            1,             0],
-                    [-np.sin(theta),            0, np.cos(theta)]])
-    R_3 = np.array([[   np.cos(psi), -np.sin(psi),             0],
-                    [   np.sin(psi),  np.cos(psi),             0],
-                    [             0,            0,             1]])
-    R = R_3 @ R_2 @ R_1
-    Inertial = np.array([x, y, z])
-    Body = R @ Inertial
-    return Body[0], Body[1], Body[2]
+    return _rot.update(phi, theta, psi).rotate((x, y, z))[0]
 
 def Body2Inertial(phi, theta, p, q, r):
-    R = np.array([[1, np.sin(phi) * np.tan(theta), np.cos(phi) * np.tan(theta)],
-                  [0,                 np.cos(phi),                -np.sin(phi)],
-                  [0, np.sin(phi) / np.cos(theta), np.cos(phi) / np.cos(theta)]])
-    Vehicle = np.array([p, q, r])
-    Inertial = R @ Vehicle
-    return Inertial[0], Inertial[1], Inertial[2]
+    return _rot.update(phi, theta, 0.0).euler_rates(p, q, r)
+
+
+
+# ================================================== #
+#    Log propagated states
+# -------------------------------------------------- #
+#  Records (n, 12) states and (n, 4) motor speeds for
+#  the non-reference paths; the derived channels are
+#  filled on first access (Post_Process.derive_states).
+# ================================================== #
+def log_states(logs, t_vec, S, U, P, dt):
+    core = np.column_stack([t_vec, S, U])
+    logs.record_block(core, CORE)
+    logs.defer(lambda: derive_states(core, P, dt))
+    return logs
 
 
 
 # ================================================== #
 #    Dynamic Model  
 # ================================================== #
-def model():
+def model(channels=None, schedule=OPEN_LOOP, method="semi_implicit", h=None,
+          rtol=1e-6, atol=1e-9, attitude="euler", params=None, backend="python",
+          controller=None, profiler=None, rotor=None):
+    # ================================================== #
+    #    Parameters (module values unless overridden)
+    # ================================================== #
+    unknown = set(params or {}) - set(PARAM_KEYS)
+    if unknown:
+        raise KeyError(f"Unknown parameter(s): {sorted(unknown)}")
+    if (controller is not None or Ctrl) and (attitude != "euler" or h is not None
+                                             or schedule is not OPEN_LOOP):
+        raise ValueError("The closed loop takes no attitude=, h= or schedule= "
+                         "(Euler angles, controller.dt, motor speeds from the controller)")
+    par = {**default_params(), **(params or {})}
+
+    m = par["m"]
+    I_x, I_y, I_z = par["I_x"], par["I_y"], par["I_z"]
+    l, angle_motor1_2 = par["l"], par["angle_motor1_2"]
+    c_T, c_RD = par["c_T"], par["c_RD"]
+    t_tot, dt = par["t_tot"], par["dt"]
+
+
+
     # ================================================== #
     #    Initial Values 
     # ================================================== #
     x = y = z = 0
     dx = dy = dz = 0
-    ddx = ddy = ddz = 0
-
-    u = v = w = 0
-    du = dv = dw = 0
 
     phi = theta = psi = 0
-    dphi = dtheta = dpsi = 0
-    prev_dphi = prev_dtheta = prev_dpsi = 0.0
-    ddphi = ddtheta = ddpsi = 0
-    
 
     p = q = r = 0
-    dp = dq = dr = 0
-
-    u1 = u2 = u3 = u4 = 0
-    omega_1 = omega_2 = omega_3 = omega_4 = 0
-    F_T = M_x = M_y = M_z = 0
 
 
 
     # ================================================== #
     #    Effective Arm Length
     # ================================================== #
-    arm_ang_23  = 180 - angle_motor1_2                   # [deg]
-    l_x = l * np.sin(deg2rad * (arm_ang_23 / 2))         # [m]
-    l_y = l * np.sin(deg2rad * (angle_motor1_2 / 2))     # [m]
+    l_x, l_y = effective_arms(l, angle_motor1_2)         # [m]
 
     omega_h = np.sqrt((m*g)/(4*c_T))                     # [rad/sec]
+    if rotor is not None:
+        omega_h = rotor.hover_speed(m, g, c_T)
+
+    P = {
+        "m": m, "I_x": I_x, "I_y": I_y, "I_z": I_z,
+        "l_x": l_x, "l_y": l_y, "c_T": c_T, "c_RD": c_RD, "g": g
+    }
     
 
 
     # ================================================== #
-    #    Logging dictionary
+    #    Logger (preallocated, constants stored once)
+    # ================================================== #
+    t_vec = np.arange(0, t_tot + dt, dt)
+    logs = Logger(len(t_vec), channels, meta={
+        "m": m,
+        "I_x": I_x, "I_y": I_y, "I_z": I_z,
+        "l": l, "angle_motor1_2": angle_motor1_2,
+        "c_T": c_T, "c_RD": c_RD
+    })
+
+
+
+    # ================================================== #
+    #    Rotation kernel (reused every step)
+    # ================================================== #
+    rot = RotationKernel()
+
+
+
+    # ================================================== #
+    #    Profiler (see Profiling.py, off when None)
     # ================================================== #
-    logs = {i: [] for i in [
-        "t", 
-        "x", "y", "z", 
-        "dx", "dy", "dz", 
-        "ddx", "ddy", "ddz",
-        
-        "u", "v", "w",
-        "du", "dv", "dw",
+    prof = profiler
+    if prof is not None:
+        prof.start(len(t_vec))
+        c0 = clock()
 
-        "phi", "theta", "psi", 
-        "dphi", "dtheta", "dpsi", 
-        "ddphi", "ddtheta", "ddpsi",
-        
-        "p", "q", "r", 
-        "dp", "dq", "dr",
 
-        "omega_1", "omega_2", "omega_3", "omega_4",
-        "F_T", "M_x", "M_y", "M_z",
 
-        "m", 
-        "I_x", "I_y", "I_z", 
-        "l", "angle_motor1_2", 
-        "c_T", "c_RD"
-    ]}
+    # ================================================== #
+    #    Motor commands (whole schedule in one call)
+    # ================================================== #
+    U = schedule.commands(t_vec, omega_h)
+    if prof is not None:
+        prof.span("commands", c0, clock())
+
+
+
+    # ================================================== #
+    #    Rotor model (see Rotor_Model.py)
+    # -------------------------------------------------- #
+    #  In open loop neither the motor lag nor the table
+    #  thrust/torque depend on the state, so both are
+    #  evaluated for the whole run, before the loop.
+    # ================================================== #
+    fm = None
+    if rotor is not None:
+        if (controller is not None or Ctrl or method != "semi_implicit"
+                or h is not None or attitude != "euler"):
+            raise ValueError("rotor= needs the open-loop semi_implicit loop (or Batch_Sim)")
+        U = rotor.motor_speeds(U, dt)
+        if rotor.table is not None:
+            fm = np.column_stack(rotor.forces_moments(U.T, P)).tolist()
+
+
+
+    # ================================================== #
+    #    Other integrators (see Integrators.py)
+    # -------------------------------------------------- #
+    #  method: euler | semi_implicit | rk4 | rk45
+    #  h:      fixed sub-step (default dt)
+    #  attitude: euler | quaternion (phi/theta/psi are
+    #            recovered once, after propagation)
+    #  Row k is the state at t_k + dt, as in the loop
+    #  below, with the input held from t_k.
+    # ================================================== #
+    if controller is None and Ctrl:
+        controller = CascadedPID(P)
+
+    if controller is None and (method != "semi_implicit" or h is not None or attitude != "euler"):
+        if attitude == "quaternion":
+            rhs, s0 = derivatives_quat, np.r_[np.zeros(6), 1.0, np.zeros(6)]
+        else:
+            rhs, s0 = derivatives, np.zeros(12)
+
+        # Commands per schedule segment (rows of U), indexed
+        # at each (sub-)step time instead of rebuilt per call
+        seg_cmd = schedule.segment_commands(omega_h)
+        if prof is not None:
+            c0 = clock()
+        S = integrate(lambda s, omega: rhs(s, omega, P),
+                      s0, np.arange(len(t_vec) + 1) * dt,
+                      lambda t: seg_cmd[schedule.index(t)], method, h,
+                      breaks=schedule.breakpoints, rtol=rtol, atol=atol,
+                      attitude=attitude)[1:]
+
+        if attitude == "quaternion":
+            phi_q, theta_q, psi_q = quat2euler(quat_normalize(S[:, QUAT].T), unwrap=True)
+            S = np.column_stack([S[:, POS], S[:, VEL], phi_q, theta_q, psi_q, S[:, QRATE]])
+
+        if prof is None:
+            return log_states(logs, t_vec, S, U, P, dt)
+        c1 = clock()
+        log_states(logs, t_vec, S, U, P, dt)
+        prof.span("integrate", c0, c1)
+        prof.span("logging", c1, clock())
+        return logs
+
+
+
+    # ================================================== #
+    #    Closed loop (see Controller.py)
+    # -------------------------------------------------- #
+    #  The controller runs at its own rate (controller.dt,
+    #  faster or slower than dt); rows are logged every dt.
+    # ================================================== #
+    if controller is not None:
+        if prof is None:
+            S, U = closed_loop(controller, np.zeros(12), t_vec, dt, P, method)
+            return log_states(logs, t_vec, S, U, P, dt)
+        c0 = clock()
+        S, U = closed_loop(controller, np.zeros(12), t_vec, dt, P, method)
+        c1 = clock()
+        log_states(logs, t_vec, S, U, P, dt)
+        prof.span("closed_loop", c0, c1)
+        prof.span("logging", c1, clock())
+        return logs
+
+
+
+    # ================================================== #
+    #    Compiled loop (see Jit_Loop.py)
+    # ================================================== #
+    if backend == "numba":
+        if HAVE_NUMBA and fm is None:
+            from Jit_Loop import run as jit_run
+            if prof is not None:
+                c0 = clock()
+            logs.record_block(jit_run(t_vec, U, dt, g, m, I_x, I_y, I_z,
+                                      l_x, l_y, c_T, c_RD))
+            if prof is not None:
+                prof.span("jit_loop", c0, clock())
+            return logs
+        warnings.warn("Numba is not installed, using the Python loop" if not HAVE_NUMBA
+                      else "Rotor tables run in the Python loop only")
 
 
 
     # ================================================== #
     #    Time loop
+    # -------------------------------------------------- #
+    #  Only the 12 states and the motor speeds (CORE)
+    #  are propagated and logged; body-frame values,
+    #  accelerations and forces/moments are derived
+    #  from them on first access (Post_Process.py).
+    #  With a profiler, m0..m5 mark the phase
+    #  boundaries (Profiling.PHASES) of each step.
     # ================================================== #
-    for t in np.arange(0, t_tot + dt, dt):
-        if not Ctrl:
-            u1, u2, u3, u4 = open_loop_motor_inputs(t, omega_h)
+    core = np.empty((len(t_vec), len(CORE)))
+    for k, (t, (u1, u2, u3, u4)) in enumerate(zip(t_vec, U.tolist())):
+        if prof is not None:
+            m0 = clock()
 
-            omega_1, omega_2, omega_3, omega_4 = u1, u2, u3, u4
+        omega_1, omega_2, omega_3, omega_4 = u1, u2, u3, u4
 
+        if fm is None:
             F_T = c_T * (omega_1**2 + omega_2**2 + omega_3**2 + omega_4**2)
             M_x = l_y * c_T * (-omega_1**2 + omega_2**2 + omega_3**2 - omega_4**2)
             M_y = l_x * c_T * (-omega_1**2 - omega_2**2 + omega_3**2 + omega_4**2)
             M_z = c_RD * (omega_1**2 - omega_2**2 + omega_3**2 - omega_4**2)
+        else:
+            F_T, M_x, M_y, M_z = fm[k]
 
-
+        if prof is not None:
+            m1 = clock()
 
         # ================================================= #
         #    Inertial frame linear dynamics
         # ================================================= #
-        ddx = (F_T / m) * (np.cos(psi) * np.sin(theta) * np.cos(phi) + np.sin(psi) * np.sin(phi))
-        ddy = (F_T / m) * (np.sin(psi) * np.sin(theta) * np.cos(phi) - np.cos(psi) * np.sin(phi))
-        ddz = -g + (F_T / m) * (np.cos(theta) * np.cos(phi))
-        dx += ddx * dt
-        dy += ddy * dt
-        dz += ddz * dt
+        b_x, b_y, b_z = rot.update(phi, theta, psi).thrust_axis
+        if prof is not None:
+            m2 = clock()
+        dx += (F_T / m) * b_x * dt
+        dy += (F_T / m) * b_y * dt
+        dz += (-g + (F_T / m) * b_z) * dt
         x += dx * dt
         y += dy * dt
         z += dz * dt
-
-        # ================================================= #
-        #    Body frame linear dynamics
-        # ================================================= #
-        u, v, w = Inertial2Body(phi, theta, psi, dx, dy, dz)
-        du, dv, dw = Inertial2Body(phi, theta, psi, ddx, ddy, ddz)
+        if prof is not None:
+            m3 = clock()
 
         # ================================================= #
         #    Body frame angular dynamics 
@@ -211,57 +373,104 @@ def model():
         # ================================================= #
         #    Inertial angular dynamics
         # ================================================= #
-        dphi, dtheta, dpsi = Body2Inertial(phi, theta, p, q, r)
-        ddphi = (dphi - prev_dphi) / dt
-        ddtheta = (dtheta - prev_dtheta) / dt
-        ddpsi = (dpsi - prev_dpsi) / dt
+        dphi, dtheta, dpsi = rot.euler_rates(p, q, r)
         phi += dphi * dt
         theta += dtheta * dt
         psi += dpsi * dt
-        prev_dphi, prev_dtheta, prev_dpsi = dphi, dtheta, dpsi
-
-
+        if prof is not None:
+            m4 = clock()
 
-# ================================================== #
-#    Save data as text and/or Excel
-# ================================================== #
-        for key, value in {
-            "t": t,
-            "x": x, "y": y, "z": z,
-            "dx": dx, "dy": dy, "dz": dz,
-            "ddx": ddx, "ddy": ddy, "ddz": ddz,
-
-            "u": u, "v": v, "w": w,
-            "du": du, "dv": dv, "dw": dw,
-
-            "phi": phi, "theta": theta, "psi": psi,
-            "dphi": dphi, "dtheta": dtheta, "dpsi": dpsi,
-            "ddphi": ddphi, "ddtheta": ddtheta, "ddpsi": ddpsi,
-
-            "p": p, "q": q, "r": r,
-            "dp": dp, "dq": dq, "dr": dr,
-
-            "omega_1": omega_1, "omega_2": omega_2,
-            "omega_3": omega_3, "omega_4": omega_4,
-            "F_T": F_T, "M_x": M_x, "M_y": M_y, "M_z": M_z,
-
-            "m": m,
-            "I_x": I_x, "I_y": I_y, "I_z": I_z,
-            "l": l, "angle_motor1_2": angle_motor1_2,
-            "c_T": c_T, "c_RD": c_RD
-        }.items():
-            logs[key].append(value)
 
 
+        # ================================================= #
+        #    Log step (core row)
+        # ================================================= #
+        core[k] = (
+            t,
+            x, y, z,
+            dx, dy, dz,
+            phi, theta, psi,
+            p, q, r,
+            omega_1, omega_2, omega_3, omega_4
+        )
+        if prof is not None:
+            prof.record((m0, m1, m2, m3, m4, clock()))
+
+    logs.record_block(core, CORE)
+    logs.defer(lambda: derive(core, P, dt, rotor))
     return logs
 
 
 
 # ================================================== #
-#    Run, log and plot
+#    Run, log and plot (command line)
+# -------------------------------------------------- #
+#  python X_Quad.py  (or `xquad` once installed)
+#  python X_Quad.py --param m=0.4 --param dt=0.01
+#  python X_Quad.py --no-plot -o run.parquet
+#  Importing this module runs nothing; the result
+#  store (pandas) and plotting (matplotlib) are
+#  loaded here only when output is requested.
+#  With numpy only, the cache is skipped (cache hits
+#  load through pandas) and so is the plot, unless
+#  --save-plot asks for it ('plot' extra).
 # ================================================== #
-logs = model()
-df = pd.DataFrame(logs)
-df.to_excel(data_path, index=False)
-
-plot_states()
+def _param(text):
+    key, sep, value = text.partition("=")
+    if not sep or key not in PARAM_KEYS:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE with KEY in {PARAM_KEYS}")
+    return key, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quadrotor (X) dynamic simulation")
+    parser.add_argument("--param", type=_param, action="append", default=[], metavar="KEY=VALUE",
+                        help="override a model parameter (repeatable)")
+    parser.add_argument("--method", choices=METHODS, default="semi_implicit")
+    parser.add_argument("--attitude", choices=ATTITUDES, default="euler")
+    parser.add_argument("--backend", choices=["python", "numba"], default="python")
+    parser.add_argument("-o", "--output", default=str(data_path),
+                        help="result file; format from the suffix (default: %(default)s)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--excel", action="store_true", default=export_excel,
+                        help="also export <output>.xlsx (slow)")
+    parser.add_argument("--no-cache", action="store_true", default=not use_cache)
+    parser.add_argument("--no-plot", action="store_true",
+                        help="do not show the plot (plotting needs matplotlib, the 'plot' extra)")
+    parser.add_argument("--save-plot", metavar="PATH", help="render the plot to a file (headless)")
+    args = parser.parse_args(argv)
+
+    plot = not args.no_plot or args.save_plot
+    if plot and importlib.util.find_spec("matplotlib") is None:
+        if args.save_plot:
+            parser.error("--save-plot needs matplotlib (pip install 'xquad-sim[plot]')")
+        warnings.warn("matplotlib is not installed (pip install 'xquad-sim[plot]'), skipping the plot")
+        plot = False
+    if not args.no_cache and importlib.util.find_spec("pandas") is None:
+        args.no_cache = True                             # cache hits are read back as DataFrames
+
+    params = dict(args.param)
+    model_kwargs = {"method": args.method, "attitude": args.attitude, "backend": args.backend}
+
+    if args.no_cache:
+        logs = model(params=params, **model_kwargs)
+    else:
+        from Result_Cache import ResultCache             # imports X_Quad itself
+        logs = ResultCache().run(params=params, **model_kwargs)
+
+    if not args.no_save or args.excel:
+        from Result_Store import save_results
+        output = Path(args.output)
+        if not args.no_save:
+            save_results(logs, output)
+        if args.excel:
+            save_results(logs, output.with_suffix(".xlsx"))
+
+    if plot:
+        from Dyn_Plots import plot_states
+        plot_states(logs, save=args.save_plot, show=not args.no_plot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
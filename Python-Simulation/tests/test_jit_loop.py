@@ -0,0 +1,138 @@
+# ================================================== #
+#    Parity tests for the fast paths
+# -------------------------------------------------- #
+#  Run from Python-Simulation:  python -m pytest
+#  Reference is the full per-step loop
+#  (Jit_Loop.propagate, uncompiled), which logs all
+#  CHANNELS inside the loop.
+# ================================================== #
+import numpy as np
+import pytest
+
+import X_Quad as XQ
+from Batch_Sim import batch_model, LOG_KEYS
+from Data_Logger import CHANNELS
+from Jit_Loop import propagate
+from Motor_Inputs import OPEN_LOOP, MotorSchedule
+
+DTS = [0.05, 0.001]
+
+
+
+def reference(t_tot=None, dt=None, **params):
+    par = {**XQ.default_params(), **params}
+    t_tot = par["t_tot"] if t_tot is None else t_tot
+    dt = par["dt"] if dt is None else dt
+    l_x, l_y = XQ.effective_arms(par["l"], par["angle_motor1_2"])
+    omega_h = np.sqrt((par["m"] * XQ.g) / (4 * par["c_T"]))
+
+    t_vec = np.arange(0, t_tot + dt, dt)
+    U = OPEN_LOOP.commands(t_vec, omega_h)
+    loop = getattr(propagate, "py_func", propagate)
+    return loop(t_vec, U, dt, XQ.g, par["m"], par["I_x"], par["I_y"], par["I_z"],
+                l_x, l_y, par["c_T"], par["c_RD"], np.zeros(15),
+                np.empty((len(t_vec), len(CHANNELS))))
+
+
+
+# ================================================== #
+#    Compiled loop (user-009)
+# ================================================== #
+@pytest.mark.parametrize("dt", DTS)
+def test_numba_matches_python(dt):
+    pytest.importorskip("numba")
+    ref = XQ.model(backend="python", params={"dt": dt})
+    fast = XQ.model(backend="numba", params={"dt": dt})
+    assert ref.channels == fast.channels == CHANNELS
+    for c in CHANNELS:
+        np.testing.assert_allclose(fast[c], ref[c], rtol=1e-12, atol=1e-9, err_msg=c)
+
+
+
+# ================================================== #
+#    Derived channels (user-018)
+# ================================================== #
+@pytest.mark.parametrize("dt", DTS)
+def test_derived_channels_match_reference_loop(dt):
+    ref = reference(dt=dt)
+    logs = XQ.model(params={"dt": dt})
+    for j, c in enumerate(CHANNELS):
+        np.testing.assert_allclose(logs[c], ref[:, j], rtol=1e-9, atol=1e-9, err_msg=c)
+
+
+def test_channel_subset_matches_full_run():
+    subset = ["t", "x", "u", "ddpsi", "F_T"]
+    full = XQ.model()
+    part = XQ.model(channels=subset)
+    assert part.channels == subset
+    for c in subset:
+        np.testing.assert_array_equal(part[c], full[c], err_msg=c)
+
+
+
+# ================================================== #
+#    Batched model (user-001)
+# ================================================== #
+def test_batch_matches_model():
+    out = batch_model(t_tot=20)
+    ref = XQ.model(params={"t_tot": 20})
+    for c in LOG_KEYS:
+        np.testing.assert_allclose(out[c][:, 0], ref[c], rtol=1e-9, atol=1e-9, err_msg=c)
+    np.testing.assert_array_equal(out["t"], ref["t"])
+
+
+def test_batch_columns_match_per_vehicle_runs():
+    masses = [0.3, 0.369, 0.45]
+    out = batch_model(t_tot=20, m=masses)
+    for i, m in enumerate(masses):
+        ref = XQ.model(params={"t_tot": 20, "m": m})
+        for c in LOG_KEYS:
+            np.testing.assert_allclose(out[c][:, i], ref[c], rtol=1e-9, atol=1e-9,
+                                       err_msg=f"{c}, vehicle {i}")
+
+
+def test_batch_channel_subset_matches_full_run():
+    subset = ["x", "u", "ddpsi", "F_T"]
+    full = batch_model(t_tot=20, m=[0.3, 0.4])
+    part = batch_model(t_tot=20, m=[0.3, 0.4], channels=subset)
+    assert set(part) == set(subset) | {"t", "state", "params"}
+    for c in subset:
+        np.testing.assert_array_equal(part[c], full[c], err_msg=c)
+    np.testing.assert_array_equal(part["state"], full["state"])
+    with pytest.raises(KeyError):
+        batch_model(t_tot=1, channels=["nope"])
+
+
+def test_batch_single_state0_is_one_vehicle():
+    out = batch_model(state0=np.zeros(12), t_tot=5)
+    assert out["x"].shape[1] == 1
+    assert out["state"].shape == (1, 12)
+
+
+
+# ================================================== #
+#    Motor schedule (user-004)
+# ================================================== #
+SCHEDULES = [OPEN_LOOP, MotorSchedule([(1, -2, 3, -400), (0, 0, 0, 0)], seg_dt=0.3, t0=-0.5)]
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES)
+def test_commands_match_scalar_lookup(schedule):
+    omega_h = 350.0
+    t_vec = np.arange(-1.0, schedule.t_end + 2.0, 0.05)
+    U = schedule.commands(t_vec, omega_h)
+    assert U.shape == (len(t_vec), 4)
+    for t, row in zip(t_vec, U):
+        assert tuple(row) == schedule(t, omega_h)
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES)
+def test_commands_match_scalar_lookup_per_vehicle(schedule):
+    omega_h = np.array([300.0, 350.0, 420.0])
+    t_vec = np.arange(-1.0, schedule.t_end + 2.0, 0.05)
+    U = schedule.commands(t_vec, omega_h)
+    assert U.shape == (len(t_vec), len(omega_h), 4)
+    for k, t in enumerate(t_vec):
+        np.testing.assert_array_equal(np.transpose(schedule.batch(t, omega_h)), U[k])
+        for i, w in enumerate(omega_h):
+            assert tuple(U[k, i]) == schedule(t, w)
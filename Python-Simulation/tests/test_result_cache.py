@@ -0,0 +1,20 @@
+# ================================================== #
+#    Result cache (user-012)
+# ================================================== #
+import pytest
+
+pytest.importorskip("pandas")
+
+from Result_Cache import ResultCache
+
+
+@pytest.mark.parametrize("limits", [{"max_bytes": 100_000}, {"max_entries": 0}])
+def test_run_keeps_the_entry_it_wrote(tmp_path, limits):
+    cache = ResultCache(root=tmp_path, **limits)
+    df = cache.run()                                     # larger than max_bytes
+    assert df is not None and df.shape == (2401, 39)
+    assert len(cache.entries()) == 1
+
+    cache.run(params={"t_tot": 3})
+    assert len(cache.entries()) == 1                     # older entry evicted
+    assert cache.run(params={"t_tot": 3}).shape == (61, 39)